@@ -1,25 +1,1711 @@
 import sys
 import os
+import argparse
+import ctypes
+import hashlib
+import importlib
+import json
+import logging
+import math
+import multiprocessing
+import re
+import shutil
+import sqlite3
+import struct
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+import zlib
+from collections import OrderedDict
+from itertools import groupby
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
 from pathlib import Path
+from typing import NamedTuple
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
-                               QHBoxLayout, QPushButton, QListWidget, QLabel, 
+                               QHBoxLayout, QPushButton, QListView, QLabel, 
                                QFileDialog, QComboBox, QSpinBox, QGroupBox,
                                QMessageBox, QProgressBar, QTabWidget, QLineEdit,
                                QCheckBox, QTextEdit, QSplitter, QDialog, QDialogButtonBox,
                                QFormLayout, QRadioButton, QButtonGroup, QInputDialog,
-                               QScrollArea, QGridLayout)
-from PySide6.QtCore import Qt, QThread, Signal, QSize
-from PySide6.QtGui import QDragEnterEvent, QDropEvent, QIcon, QPixmap, QImage
-import PyPDF2
-from pdf2image import convert_from_path
-from PIL import Image
+                               QScrollArea, QAbstractItemView, QStyledItemDelegate, QStyle)
+from PySide6.QtCore import (Qt, QThread, Signal, QSize, QAbstractListModel, QModelIndex,
+                            QRect, QRectF, QObject, QTimer, QFileSystemWatcher,
+                            QThreadPool, QRunnable, QPointF, QItemSelection,
+                            QItemSelectionModel)
+from PySide6.QtGui import (QDragEnterEvent, QDropEvent, QIcon, QImage, QPainter,
+                           QColor, QPen, QFont, QPalette)
 import io
 
 
+class LazyModule:
+    """属性に初めてアクセスしたときにモジュールを読み込む（起動を速くするため）"""
+    
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+    
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+# 重いモジュールは使うときまで読み込まない
+PyPDF2 = LazyModule("PyPDF2")
+generic = LazyModule("PyPDF2.generic")
+pdf2image = LazyModule("pdf2image")
+Image = LazyModule("PIL.Image")
+ImageOps = LazyModule("PIL.ImageOps")
+TiffImagePlugin = LazyModule("PIL.TiffImagePlugin")
+np = LazyModule("numpy")
+# フォントのサブセット化に使う
+font_subset = LazyModule("fontTools.subset")
+ttLib = LazyModule("fontTools.ttLib")
+
+
+def pil_to_qimage(image):
+    """PIL ImageをQImageに変換（別スレッドからも呼び出し可能）"""
+    image = image.convert("RGB")
+    data = image.tobytes("raw", "RGB")
+    qimage = QImage(data, image.width, image.height, image.width * 3,
+                    QImage.Format.Format_RGB888)
+    # dataの寿命に依存しないようにコピーする
+    return qimage.copy()
+
+
+def render_page_region(pdf_path, page_number, dpi, x, y, width, height, grayscale=False):
+    """ページの一部の領域だけをpdftoppmで描画（page_numberは1始まり）"""
+    command = [
+        "pdftoppm", "-f", str(page_number), "-l", str(page_number),
+        "-r", str(dpi), "-x", str(x), "-y", str(y),
+        "-W", str(width), "-H", str(height), "-png", str(pdf_path)
+    ]
+    if grayscale:
+        command.insert(-1, "-gray")
+    result = subprocess.run(command, capture_output=True, startupinfo=hidden_console_startupinfo())
+    if result.returncode != 0:
+        raise Exception(result.stderr.decode(errors="replace").strip() or "pdftoppmの実行に失敗しました")
+    return Image.open(io.BytesIO(result.stdout))
+
+
+def hidden_console_startupinfo():
+    """Windowsで外部コマンドのコンソールウィンドウを表示しないための設定"""
+    if sys.platform != "win32":
+        return None
+    startupinfo = subprocess.STARTUPINFO()
+    startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    return startupinfo
+
+
+def linearize_pdf(pdf_path, password=None):
+    """qpdfでPDFをリニアライズ（Web表示用に最適化）して置き換える
+    
+    最初のページの表示に必要なオブジェクトとヒントテーブルがファイルの先頭に
+    置かれるため、HTTPの範囲リクエストで全体のダウンロードを待たずに表示できる。
+    """
+    temp_path = f"{pdf_path}.linearize.tmp"
+    command = ["qpdf", "--linearize"]
+    if password:
+        # 暗号化はそのまま引き継がれる（パスワードはコマンドラインに出さず標準入力で渡す）
+        command.append("--password-file=-")
+    command += [str(pdf_path), temp_path]
+    result = subprocess.run(command, input=(password or "").encode(), capture_output=True,
+                            startupinfo=hidden_console_startupinfo())
+    # 終了コード3は警告ありで成功
+    if result.returncode not in (0, 3):
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise Exception(result.stderr.decode(errors="replace").strip() or "qpdfの実行に失敗しました")
+    os.replace(temp_path, pdf_path)
+
+
+class AtomicOutputFile:
+    """出力先と同じフォルダの一時ファイルに大きなバッファで書き込み、完了したら置き換える
+    
+    途中で失敗した場合は一時ファイルを削除するため、出力先に書きかけのファイルが
+    残らない。置き換えは同じフォルダ内のos.replaceなので一度に行われる。
+    with文で使い、書き込み先のファイルオブジェクトを受け取る。
+    """
+    BUFFER_SIZE = 1024 * 1024
+    
+    def __init__(self, path, fsync=False, mode='wb', on_commit=None):
+        self.path = os.fspath(path)
+        self.fsync = fsync
+        self.mode = mode
+        self.on_commit = on_commit
+        self.bytes_written = 0
+        self.discarded = False
+        directory, name = os.path.split(os.path.abspath(self.path))
+        # 監視フォルダなどで拾われないよう、隠しファイル・.tmpの名前にする
+        self.temp_path = os.path.join(directory, f".{name}.{uuid.uuid4().hex[:8]}.tmp")
+        self.file = None
+    
+    def __enter__(self):
+        self.file = open(self.temp_path, self.mode.replace('w', 'x'), buffering=self.BUFFER_SIZE)
+        return self.file
+    
+    def discard(self):
+        """書き込んだ内容を出力先に置かずに捨てる（with文を抜けるときに一時ファイルを削除）"""
+        self.discarded = True
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        commit = exc_type is None and not self.discarded
+        try:
+            # 書き込みに失敗しても、一時ファイルを削除できるよう必ず閉じる（Windowsでは開いたままだと削除できない）
+            try:
+                if commit:
+                    self.file.flush()
+                    self.bytes_written = self.file.seek(0, os.SEEK_END)
+                    if self.fsync:
+                        os.fsync(self.file.fileno())
+            finally:
+                self.file.close()
+            if commit:
+                os.replace(self.temp_path, self.path)
+        finally:
+            if os.path.exists(self.temp_path):
+                os.remove(self.temp_path)
+        if commit and self.on_commit is not None:
+            self.on_commit(self.bytes_written)
+        return False
+
+
+def check_max_bytes(value):
+    """分割するファイルの上限サイズ（バイト数）を確認して返す"""
+    if isinstance(value, bool) or not isinstance(value, int) or value <= 0:
+        raise ValueError(f"分割サイズの上限は正の整数（バイト数）で指定してください: {value!r}")
+    return value
+
+
+def available_memory_bytes():
+    """使用可能な物理メモリ量（バイト）を取得（取得できなければNone）"""
+    if sys.platform == "win32":
+        class MemoryStatusEx(ctypes.Structure):
+            _fields_ = [
+                ("dwLength", ctypes.c_ulong),
+                ("dwMemoryLoad", ctypes.c_ulong),
+                ("ullTotalPhys", ctypes.c_ulonglong),
+                ("ullAvailPhys", ctypes.c_ulonglong),
+                ("ullTotalPageFile", ctypes.c_ulonglong),
+                ("ullAvailPageFile", ctypes.c_ulonglong),
+                ("ullTotalVirtual", ctypes.c_ulonglong),
+                ("ullAvailVirtual", ctypes.c_ulonglong),
+                ("ullAvailExtendedVirtual", ctypes.c_ulonglong),
+            ]
+        
+        status = MemoryStatusEx()
+        status.dwLength = ctypes.sizeof(MemoryStatusEx)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.ullAvailPhys
+        return None
+    
+    try:
+        with open("/proc/meminfo") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+class RenderStep(NamedTuple):
+    """1回の描画の単位（ページ番号は0始まりで、first〜last-1を描画）"""
+    first: int
+    last: int
+    dpi: int
+    strip_rows: int = 0  # 0以外なら1ページをこの行数ずつの帯に分けて描画する
+    color_mode: str = 'rgb'  # 'rgb' / 'gray' / 'bilevel'
+
+
+class RenderMemoryGovernor:
+    """ページの大きさ・解像度・色から描画に必要なメモリを見積もり、
+    使用可能なメモリに収まるよう一度に描画するページ数や描画方法を決める"""
+    # 使用可能なメモリのうち描画に使う割合
+    BUDGET_RATIO = 0.5
+    # 使用可能なメモリを取得できないときの予算
+    FALLBACK_BUDGET = 1024 ** 3
+    # pdftoppmの描画・受け渡し・Pillow・NumPyの作業領域を含めた1画素あたりのバイト数
+    WORKING_BYTES_PER_PIXEL = {'rgb': 16, 'gray': 5, 'bilevel': 5}
+    # 帯ごとに描画して組み立てたページの、後処理を含めた1画素あたりのバイト数
+    ASSEMBLED_BYTES_PER_PIXEL = {'rgb': 7, 'gray': 3, 'bilevel': 3}
+    MAX_WINDOW_PAGES = 8
+    MIN_STRIP_ROWS = 64
+    MIN_DPI = 36
+    
+    def __init__(self, color_mode, downsample=1, budget=None):
+        if budget is None:
+            available = available_memory_bytes()
+            budget = int(available * self.BUDGET_RATIO) if available else self.FALLBACK_BUDGET
+        self.budget = budget
+        self.color_mode = color_mode
+        self.downsample = max(downsample, 1)
+    
+    @staticmethod
+    def pixel_size(page_size, dpi):
+        """ページの大きさ（ポイント）から描画後の画素数（幅, 高さ）を求める"""
+        width, height = page_size
+        return math.ceil(width * dpi / 72), math.ceil(height * dpi / 72)
+    
+    def working_bytes(self, page_size, dpi, color_mode=None):
+        """1ページをそのまま描画するのに必要なメモリ"""
+        width, height = self.pixel_size(page_size, dpi)
+        return width * height * self.WORKING_BYTES_PER_PIXEL[color_mode or self.color_mode]
+    
+    def assembled_bytes(self, page_size, dpi, color_mode=None):
+        """帯ごとに描画して組み立てたページが使うメモリ"""
+        width, height = self.pixel_size(page_size, dpi)
+        pixels = (width // self.downsample) * (height // self.downsample)
+        return pixels * self.ASSEMBLED_BYTES_PER_PIXEL[color_mode or self.color_mode]
+    
+    def plan(self, page_sizes, dpi, page_modes=None):
+        """ページごとの大きさから描画の手順（RenderStepのリスト）を作成
+        
+        page_modesでページごとの色（'rgb' / 'gray' / 'bilevel'）を指定すると、
+        色の異なるページは別の手順に分け、それぞれの色でメモリを見積もる。
+        """
+        if page_modes is None:
+            page_modes = [self.color_mode] * len(page_sizes)
+        steps = []
+        window_first = None
+        window_bytes = 0
+        for index, (page_size, color_mode) in enumerate(zip(page_sizes, page_modes)):
+            cost = self.working_bytes(page_size, dpi, color_mode)
+            if window_first is not None and (
+                    window_bytes + cost > self.budget
+                    or index - window_first >= self.MAX_WINDOW_PAGES
+                    or color_mode != page_modes[window_first]
+                    or cost > self.budget):
+                steps.append(RenderStep(window_first, index, dpi,
+                                        color_mode=page_modes[window_first]))
+                window_first = None
+            
+            if cost > self.budget:
+                steps.append(self.plan_oversize_page(index, page_size, dpi, color_mode))
+                continue
+            if window_first is None:
+                window_first, window_bytes = index, 0
+            window_bytes += cost
+        
+        if window_first is not None:
+            steps.append(RenderStep(window_first, len(page_sizes), dpi,
+                                    color_mode=page_modes[window_first]))
+        return steps
+    
+    def plan_oversize_page(self, index, page_size, dpi, color_mode=None):
+        """1ページで予算を超えるページを帯に分けて描画する（組み立て後も収まらなければ解像度を下げる）"""
+        color_mode = color_mode or self.color_mode
+        # 予算の3/4までを組み立て後のページに、残りを帯の描画に使う
+        limit = self.budget * 3 // 4
+        assembled = self.assembled_bytes(page_size, dpi, color_mode)
+        if assembled > limit:
+            dpi = max(int(dpi * math.sqrt(limit / assembled)), self.MIN_DPI)
+            assembled = self.assembled_bytes(page_size, dpi, color_mode)
+        
+        width, _ = self.pixel_size(page_size, dpi)
+        row_bytes = width * self.WORKING_BYTES_PER_PIXEL[color_mode]
+        rows = max((self.budget - assembled) // row_bytes, self.MIN_STRIP_ROWS)
+        # 縮小の単位で区切れるようにする
+        rows -= rows % self.downsample
+        return RenderStep(index, index + 1, dpi, rows, color_mode)
+
+
+class ImageOutputFormat(NamedTuple):
+    """画像変換の出力形式"""
+    save_format: str  # Pillowの保存形式（PDFは画像PDF）
+    extension: str
+    color_mode: str  # 'rgb' / 'gray' / 'bilevel'
+    save_options: dict
+    multipage: bool = False  # 全ページを1ファイルに書き出す
+
+
+IMAGE_OUTPUT_FORMATS = {
+    'JPEG': ImageOutputFormat('JPEG', 'jpeg', 'rgb', {}),
+    'PNG': ImageOutputFormat('PNG', 'png', 'rgb', {}),
+    'PNG_GRAY': ImageOutputFormat('PNG', 'png', 'gray', {}),
+    'TIFF_G4': ImageOutputFormat('TIFF', 'tif', 'bilevel', {'compression': 'group4'}),
+    'TIFF_MULTI_G4': ImageOutputFormat('TIFF', 'tif', 'bilevel', {'compression': 'group4'}, True),
+    'TIFF_MULTI_GRAY': ImageOutputFormat('TIFF', 'tif', 'gray', {'compression': 'tiff_lzw'}, True),
+    'PDF_IMAGE': ImageOutputFormat('PDF', 'pdf', 'rgb', {'quality': 85}, True),
+    'PDF_IMAGE_BILEVEL': ImageOutputFormat('PDF', 'pdf', 'bilevel', {}, True),
+}
+# 自動トリミングで余白とみなす明るさ
+CROP_BACKGROUND_LEVEL = 245
+# グレースケール変換で一度に計算する行数
+GRAY_BLOCK_ROWS = 256
+# ページの色を判定するための低解像度描画の解像度と、1回の描画で扱うページ数
+COLOR_PROBE_DPI = 18
+COLOR_PROBE_PAGES = 64
+# チャンネル間の差がこれ以下の画素は無彩色とみなす（JPEGのノイズなどを許容）
+COLOR_TOLERANCE = 24
+# 有彩色の画素がこの割合を超えるページをカラーとみなす
+COLOR_PIXEL_RATIO = 0.0002
+# 色の判定の指定（自動判定・常にカラー・常にグレースケール・常に白黒2値）
+COLOR_DETECTION_MODES = ('auto', 'color', 'gray', 'bilevel')
+
+
+def rgb_array(image):
+    """画像をRGBの配列に変換（すでにRGBならコピーを増やさない）"""
+    return np.asarray(image if image.mode == 'RGB' else image.convert('RGB'))
+
+
+def to_gray_array(image):
+    """画像を8bitグレースケールの配列に変換（ITU-R BT.601の係数）"""
+    if image.mode == 'L':
+        return np.asarray(image)
+    rgb = rgb_array(image)
+    gray = np.empty(rgb.shape[:2], dtype=np.uint8)
+    # 大きなページでも一時配列が膨らまないよう、行のまとまりごとに計算する
+    for top in range(0, rgb.shape[0], GRAY_BLOCK_ROWS):
+        block = rgb[top:top + GRAY_BLOCK_ROWS].astype(np.uint32)
+        gray[top:top + GRAY_BLOCK_ROWS] = (
+            block[..., 0] * 299 + block[..., 1] * 587 + block[..., 2] * 114 + 500) // 1000
+    return gray
+
+
+def is_monochrome_image(image):
+    """有彩色の画素がほとんどない（グレースケールで描画しても見た目が変わらない）画像か"""
+    if image.mode in ('1', 'L', 'LA', 'I', 'F'):
+        return True
+    rgb = rgb_array(image)
+    chroma = rgb.max(axis=2).astype(np.int16) - rgb.min(axis=2)
+    return np.count_nonzero(chroma > COLOR_TOLERANCE) <= chroma.size * COLOR_PIXEL_RATIO
+
+
+def detect_monochrome_pages(pdf_path, pages):
+    """低解像度で描画してページの色を判定し、白黒（無彩色）のページ番号の集合を返す（0始まり）"""
+    monochrome = set()
+    for first, last in page_ranges(sorted(pages), COLOR_PROBE_PAGES):
+        images = pdf2image.convert_from_path(pdf_path, dpi=COLOR_PROBE_DPI,
+                                             first_page=first + 1, last_page=last)
+        monochrome.update(first + offset for offset, image in enumerate(images)
+                          if is_monochrome_image(image))
+    return monochrome
+
+
+def otsu_threshold(gray):
+    """大津の方法で2値化のしきい値を求める"""
+    histogram = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    total = histogram.sum()
+    levels = np.arange(256, dtype=np.float64)
+    weight_dark = np.cumsum(histogram)
+    weight_light = total - weight_dark
+    sum_dark = np.cumsum(histogram * levels)
+    mean_dark = sum_dark / np.maximum(weight_dark, 1)
+    mean_light = (sum_dark[-1] - sum_dark) / np.maximum(weight_light, 1)
+    variance = weight_dark * weight_light * (mean_dark - mean_light) ** 2
+    # しきい値以下を黒とするため、境界の次の値を返す
+    return int(np.argmax(variance)) + 1
+
+
+def content_bounds(gray, margin=0):
+    """余白を除いた内容部分の範囲 (上, 下, 左, 右) を求める"""
+    ink = gray < CROP_BACKGROUND_LEVEL
+    rows = np.flatnonzero(ink.any(axis=1))
+    cols = np.flatnonzero(ink.any(axis=0))
+    height, width = gray.shape
+    if rows.size == 0:
+        return 0, height, 0, width
+    return (max(int(rows[0]) - margin, 0), min(int(rows[-1]) + 1 + margin, height),
+            max(int(cols[0]) - margin, 0), min(int(cols[-1]) + 1 + margin, width))
+
+
+def downsample_array(array, factor):
+    """factor×factorの画素を平均して縮小"""
+    if factor <= 1:
+        return array
+    height = array.shape[0] // factor * factor
+    width = array.shape[1] // factor * factor
+    blocks = array[:height, :width].reshape(
+        (height // factor, factor, width // factor, factor) + array.shape[2:])
+    total = blocks.sum(axis=(1, 3), dtype=np.uint32)
+    return ((total + factor * factor // 2) // (factor * factor)).astype(np.uint8)
+
+
+def postprocess_page_image(image, color_mode='rgb', threshold=None, auto_crop=False,
+                           downsample=1):
+    """描画したページ画像をグレースケール化・2値化・余白トリミング・縮小する"""
+    if color_mode == 'rgb':
+        array = rgb_array(image)
+        gray = to_gray_array(image) if auto_crop else None
+    else:
+        array = gray = to_gray_array(image)
+    
+    if auto_crop:
+        top, bottom, left, right = content_bounds(gray, margin=2 * max(downsample, 1))
+        array = array[top:bottom, left:right]
+    
+    array = downsample_array(array, downsample)
+    
+    if color_mode == 'rgb':
+        return Image.fromarray(np.ascontiguousarray(array), 'RGB')
+    if color_mode == 'gray':
+        return Image.fromarray(np.ascontiguousarray(array), 'L')
+    
+    if threshold is None:
+        threshold = otsu_threshold(array)
+    # モード'1'は1が白なので、しきい値以上を1として行ごとにビットを詰める
+    bits = np.packbits(array >= threshold, axis=1)
+    return Image.frombytes('1', (array.shape[1], array.shape[0]), bits.tobytes())
+
+
+class EncodedImage(NamedTuple):
+    """PDFの画像XObjectにそのまま格納できる圧縮済みの画像"""
+    data: bytes
+    width: int
+    height: int
+    color_space: bytes
+    bits: int
+    image_filter: bytes
+    dpi: tuple  # (横, 縦)
+    decode_parms: bytes = None
+    decode: bytes = None
+    rotation: int = 0  # ページの/Rotate
+
+
+def encode_pixels(image, dpi, quality=85, lossless=False):
+    """PIL Imageを圧縮してEncodedImageにする（lossless=TrueならJPEGを使わない）"""
+    if not isinstance(dpi, tuple):
+        dpi = (dpi, dpi)
+    if image.mode == '1':
+        encoded = encode_bilevel_g4(image, dpi)
+        if encoded is not None:
+            return encoded
+        # モード'1'もPDFのDeviceGray 1bitも1が白なのでそのまま格納できる
+        return EncodedImage(zlib.compress(image.tobytes(), 6), image.width, image.height,
+                            b"/DeviceGray", 1, b"/FlateDecode", dpi)
+    if 'A' in image.mode or 'transparency' in image.info:
+        # 透過部分は白の背景に重ねる
+        rgba = image.convert('RGBA')
+        image = Image.new('RGBA', rgba.size, (255, 255, 255, 255))
+        image.alpha_composite(rgba)
+    if image.mode not in ('L', 'RGB', 'CMYK') or (image.mode == 'CMYK' and not lossless):
+        image = image.convert('RGB')
+    color_space = {'L': b"/DeviceGray", 'RGB': b"/DeviceRGB", 'CMYK': b"/DeviceCMYK"}[image.mode]
+    
+    if lossless:
+        return EncodedImage(zlib.compress(image.tobytes(), 6), image.width, image.height,
+                            color_space, 8, b"/FlateDecode", dpi)
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=quality)
+    return EncodedImage(buffer.getvalue(), image.width, image.height, color_space, 8,
+                        b"/DCTDecode", dpi)
+
+
+class StreamingImagePDFWriter:
+    """ページ画像を1枚ずつ書き出す画像PDFライター（全ページをメモリに保持しない）
+    
+    オブジェクト1がカタログ、2がページツリーで、ページツリーは最後に書き出す。
+    """
+    CATALOG_ID = 1
+    PAGES_ID = 2
+    
+    def __init__(self, output):
+        self.output = output
+        self.offsets = {}
+        self.page_ids = []
+        self.next_id = 3
+        self.output.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    
+    def _allocate_id(self):
+        object_id = self.next_id
+        self.next_id += 1
+        return object_id
+    
+    def _write_object(self, object_id, *parts):
+        self.offsets[object_id] = self.output.tell()
+        self.output.write(b"%d 0 obj\n" % object_id)
+        for part in parts:
+            self.output.write(part)
+        self.output.write(b"\nendobj\n")
+    
+    def _write_stream(self, object_id, entries, data):
+        # 画像データは連結せずにそのまま書き出す
+        header = b"<< %s /Length %d >>\nstream\n" % (entries, len(data))
+        self._write_object(object_id, header, data, b"\nendstream")
+    
+    def add_encoded_image(self, encoded):
+        """圧縮済みの画像を1ページとして追加（解像度からページの大きさを決める）"""
+        image_id, content_id, page_id = (self._allocate_id() for _ in range(3))
+        entries = (b"/Type /XObject /Subtype /Image /Width %d /Height %d "
+                   b"/ColorSpace %s /BitsPerComponent %d /Filter %s"
+                   % (encoded.width, encoded.height, encoded.color_space, encoded.bits,
+                      encoded.image_filter))
+        if encoded.decode_parms:
+            entries += b" /DecodeParms " + encoded.decode_parms
+        if encoded.decode:
+            entries += b" /Decode " + encoded.decode
+        self._write_stream(image_id, entries, encoded.data)
+        
+        dpi_x, dpi_y = encoded.dpi
+        page_width = encoded.width * 72 / dpi_x
+        page_height = encoded.height * 72 / dpi_y
+        content = b"q %.4f 0 0 %.4f 0 0 cm /Im0 Do Q" % (page_width, page_height)
+        self._write_stream(content_id, b"", content)
+        
+        rotate = b" /Rotate %d" % encoded.rotation if encoded.rotation else b""
+        self._write_object(page_id, (
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %.4f %.4f]%s "
+            b"/Resources << /XObject << /Im0 %d 0 R >> >> /Contents %d 0 R >>"
+            % (self.PAGES_ID, page_width, page_height, rotate, image_id, content_id)))
+        self.page_ids.append(page_id)
+    
+    def add_image_page(self, image, dpi, quality=85, lossless=False):
+        """PIL Imageを圧縮して1ページとして追加"""
+        self.add_encoded_image(encode_pixels(image, dpi, quality, lossless))
+    
+    def close(self):
+        """ページツリー・カタログ・相互参照表を書き出して完成させる"""
+        kids = b" ".join(b"%d 0 R" % page_id for page_id in self.page_ids)
+        self._write_object(self.PAGES_ID, b"<< /Type /Pages /Kids [%s] /Count %d >>"
+                           % (kids, len(self.page_ids)))
+        self._write_object(self.CATALOG_ID, b"<< /Type /Catalog /Pages %d 0 R >>" % self.PAGES_ID)
+        
+        xref_offset = self.output.tell()
+        lines = [b"xref\n0 %d\n" % self.next_id, b"0000000000 65535 f \n"]
+        lines.extend(b"%010d 00000 n \n" % self.offsets[object_id]
+                     for object_id in range(1, self.next_id))
+        lines.append(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                     % (self.next_id, self.CATALOG_ID, xref_offset))
+        self.output.write(b"".join(lines))
+
+
+# 画像からPDFを作成するときに読み込める画像の拡張子
+IMAGE_INPUT_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.tif', '.tiff')
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+# EXIFの向き -> ページの回転角度（反転を含む向きは画素を並べ替えて格納する）
+EXIF_ORIENTATION_ROTATION = {1: 0, 3: 180, 6: 90, 8: 270}
+# 画像に解像度の情報がないとみなす値
+MIN_IMAGE_DPI = 10
+
+
+def image_dpi(image, default_dpi):
+    """画像に記録された解像度を取得（記録がなければdefault_dpi）"""
+    dpi = image.info.get('dpi')
+    try:
+        dpi_x, dpi_y = (float(value) for value in dpi)
+    except (TypeError, ValueError):
+        return default_dpi, default_dpi
+    if dpi_x < MIN_IMAGE_DPI or dpi_y < MIN_IMAGE_DPI:
+        return default_dpi, default_dpi
+    return dpi_x, dpi_y
+
+
+def encode_jpeg_passthrough(file_path, image, dpi):
+    """JPEGのデータをそのままDCTストリームにする（できない場合はNone）"""
+    color_spaces = {'L': b"/DeviceGray", 'RGB': b"/DeviceRGB", 'CMYK': b"/DeviceCMYK"}
+    orientation = image.getexif().get(0x0112, 1)
+    if image.mode not in color_spaces or orientation not in EXIF_ORIENTATION_ROTATION:
+        return None
+    # Adobe形式のCMYK JPEGは値が反転して記録されている
+    decode = b"[1 0 1 0 1 0 1 0]" if image.mode == 'CMYK' and 'adobe' in image.info else None
+    with open(file_path, 'rb') as jpeg_file:
+        data = jpeg_file.read()
+    return EncodedImage(data, image.width, image.height, color_spaces[image.mode], 8,
+                        b"/DCTDecode", dpi, decode=decode,
+                        rotation=EXIF_ORIENTATION_ROTATION[orientation])
+
+
+def encode_png_passthrough(file_path, dpi):
+    """PNGの圧縮データ（IDAT）をそのままFlateストリームにする（できない場合はNone）"""
+    header = palette = None
+    chunks = []
+    with open(file_path, 'rb') as png_file:
+        if png_file.read(8) != PNG_SIGNATURE:
+            return None
+        while True:
+            chunk_header = png_file.read(8)
+            if len(chunk_header) < 8:
+                break
+            length, kind = struct.unpack('>I4s', chunk_header)
+            data = png_file.read(length)
+            png_file.seek(4, os.SEEK_CUR)  # CRC
+            if kind == b'IHDR':
+                header = struct.unpack('>IIBBBBB', data)
+            elif kind == b'PLTE':
+                palette = data
+            elif kind == b'tRNS':
+                return None
+            elif kind == b'IDAT':
+                chunks.append(data)
+            elif kind == b'IEND':
+                break
+    if header is None:
+        return None
+    
+    width, height, bits, color_type, _, _, interlace = header
+    # 透過・インターレース・16bitはPDFの予測子付きFlateでは扱えない
+    if interlace or bits == 16 or color_type not in (0, 2, 3) or (color_type == 3 and not palette):
+        return None
+    if color_type == 3:
+        color_space = b"[/Indexed /DeviceRGB %d <%s>]" % (len(palette) // 3 - 1,
+                                                            palette.hex().encode())
+    else:
+        color_space = b"/DeviceGray" if color_type == 0 else b"/DeviceRGB"
+    colors = 3 if color_type == 2 else 1
+    decode_parms = (b"<< /Predictor 15 /Colors %d /BitsPerComponent %d /Columns %d >>"
+                    % (colors, bits, width))
+    return EncodedImage(b"".join(chunks), width, height, color_space, bits, b"/FlateDecode",
+                        dpi, decode_parms)
+
+
+def encode_tiff_g4_passthrough(image, dpi):
+    """1ストリップのCCITT G4 TIFFのデータをそのままCCITTFaxストリームにする（できない場合はNone）"""
+    tags = image.tag_v2
+    offsets = tags.get(273, ())
+    if (image.info.get('compression') != 'group4' or len(offsets) != 1
+            or tags.get(266, 1) != 1 or tags.get(274, 1) != 1):
+        return None
+    image.fp.seek(offsets[0])
+    data = image.fp.read(tags[279][0])
+    # CCITTの白の並びは、Photometricが0なら白、1なら黒として表示される
+    black_is_1 = b"true" if tags.get(262, 0) == 1 else b"false"
+    decode_parms = (b"<< /K -1 /Columns %d /Rows %d /BlackIs1 %s >>"
+                    % (image.width, image.height, black_is_1))
+    return EncodedImage(data, image.width, image.height, b"/DeviceGray", 1,
+                        b"/CCITTFaxDecode", dpi, decode_parms)
+
+
+def encode_bilevel_g4(image, dpi):
+    """白黒の画像をCCITT G4で圧縮（PillowがlibtiffなしでビルドされていればNone）"""
+    buffer = io.BytesIO()
+    try:
+        # PDFに格納できるよう全体を1つのストリップにする
+        image.save(buffer, 'TIFF', compression='group4', tiffinfo={278: image.height})
+    except (OSError, KeyError):
+        return None
+    buffer.seek(0)
+    with Image.open(buffer) as tiff:
+        return encode_tiff_g4_passthrough(tiff, dpi)
+
+
+def iter_encoded_images(file_path, default_dpi):
+    """画像ファイルの各ページをPDFに格納できる形で順に返す
+    
+    JPEG・PNG・G4 TIFFはデータをそのまま使い、それ以外は画素を展開して圧縮し直す。
+    """
+    with Image.open(file_path) as image:
+        for frame in range(getattr(image, 'n_frames', 1)):
+            image.seek(frame)
+            dpi = image_dpi(image, default_dpi)
+            encoded = None
+            if image.format == 'JPEG':
+                encoded = encode_jpeg_passthrough(file_path, image, dpi)
+            elif image.format == 'PNG':
+                encoded = encode_png_passthrough(file_path, dpi)
+            elif image.format == 'TIFF':
+                encoded = encode_tiff_g4_passthrough(image, dpi)
+            
+            if encoded is None:
+                # 向きを画素に反映してから圧縮し直す（JPEGは画質を保ってJPEGのまま）
+                pixels = ImageOps.exif_transpose(image)
+                encoded = encode_pixels(pixels, dpi, quality=95,
+                                        lossless=image.format != 'JPEG')
+            yield encoded
+
+
+# コンテンツストリーム中の名前（/F1 など）
+CONTENT_NAME_PATTERN = re.compile(rb'/([^\s/\[\]()<>{}%]*)')
+NAME_ESCAPE_PATTERN = re.compile(rb'#([0-9a-fA-F]{2})')
+# コンテンツストリームから名前で参照されるリソースの種類
+PRUNABLE_RESOURCES = ('/Font', '/XObject', '/ExtGState', '/ColorSpace',
+                      '/Pattern', '/Shading', '/Properties')
+
+
+def get_content_data(page):
+    """ページのコンテンツストリームを展開したデータを取得"""
+    contents = page.get('/Contents')
+    if contents is None:
+        return b''
+    contents = contents.get_object()
+    if isinstance(contents, generic.ArrayObject):
+        return b'\n'.join(stream.get_object().get_data() for stream in contents)
+    return contents.get_data()
+
+
+def get_content_names(data):
+    """コンテンツストリームに現れる名前の集合を取得"""
+    names = set()
+    for raw_name in set(CONTENT_NAME_PATTERN.findall(data)):
+        raw_name = NAME_ESCAPE_PATTERN.sub(lambda m: bytes([int(m.group(1), 16)]), raw_name)
+        try:
+            names.add('/' + raw_name.decode('utf-8'))
+        except UnicodeDecodeError:
+            names.add('/' + raw_name.decode('latin-1'))
+    return names
+
+
+def inherited_resource_names(page, resources):
+    """ページのリソースを使うコンテンツに現れる名前の集合を取得（展開できないものがあればNone）
+    
+    ページ本体に加え、自身の/Resourcesを持たないフォームXObject・Type3フォントの
+    グリフ・注釈の外観ストリームはページのリソースを継承するため、その中の名前も集める。
+    """
+    try:
+        xobjects = resources.get('/XObject')
+        xobjects = xobjects.get_object() if xobjects is not None else generic.DictionaryObject()
+        fonts = resources.get('/Font')
+        fonts = fonts.get_object() if fonts is not None else generic.DictionaryObject()
+        
+        pending = [get_content_data(page)]
+        # 注釈の外観ストリーム（/AP /N /R /D、状態ごとの辞書の場合もある）
+        for annotation in page.get('/Annots', None) or []:
+            appearances = annotation.get_object().get('/AP')
+            for appearance in (appearances.get_object().values() if appearances is not None else []):
+                appearance = appearance.get_object()
+                states = appearance.values() if not isinstance(appearance, generic.StreamObject) else [appearance]
+                for state in states:
+                    state = state.get_object()
+                    if isinstance(state, generic.StreamObject) and '/Resources' not in state:
+                        pending.append(state.get_data())
+        
+        names = set()
+        while pending:
+            new_names = get_content_names(pending.pop()) - names
+            names |= new_names
+            for name in new_names:
+                xobject = xobjects[name].get_object() if name in xobjects else None
+                if (isinstance(xobject, generic.StreamObject) and xobject.get('/Subtype') == '/Form'
+                        and '/Resources' not in xobject):
+                    pending.append(xobject.get_data())
+                font = fonts[name].get_object() if name in fonts else None
+                if (isinstance(font, generic.DictionaryObject) and font.get('/Subtype') == '/Type3'
+                        and '/Resources' not in font):
+                    pending.extend(proc.get_object().get_data()
+                                   for proc in font['/CharProcs'].get_object().values())
+        return names
+    except Exception:
+        return None
+
+
+def prune_page_resources(page):
+    """コンテンツストリームで使われていないリソースをページから取り除く
+    
+    ページが文書全体の共有リソースを継承している場合、そのまま書き出すと
+    すべてのフォントや画像が各ページに含まれてしまう。名前で参照される
+    リソースのうち、ページのリソースを使うコンテンツに現れるものだけを残す
+    （使われているかを確かめられないページはそのまま）。
+    """
+    resources = page.get('/Resources')
+    if resources is None:
+        return page
+    resources = resources.get_object()
+    names = inherited_resource_names(page, resources)
+    if names is None:
+        return page
+    
+    pruned = generic.DictionaryObject()
+    for category, entries in resources.items():
+        entries_object = entries.get_object()
+        if category in PRUNABLE_RESOURCES and isinstance(entries_object, generic.DictionaryObject):
+            used = generic.DictionaryObject({key: value for key, value in entries_object.items() if key in names})
+            if used:
+                pruned[generic.NameObject(category)] = used
+        else:
+            pruned[generic.NameObject(category)] = entries
+    page[generic.NameObject('/Resources')] = pruned
+    return page
+
+
+TEXT_SHOW_OPERATORS = (b'Tj', b'TJ', b"'", b'"')
+
+
+def text_string_bytes(obj):
+    """文字列オブジェクトの元のバイト列（文字列以外は空）"""
+    if isinstance(obj, generic.TextStringObject):
+        return obj.original_bytes
+    if isinstance(obj, generic.ByteStringObject):
+        return bytes(obj)
+    return b''
+
+
+class FontUsageCollector:
+    """ページ・フォームXObject・注釈の外観で使われている文字コードをフォントごとに集める
+    
+    フォントは参照元のオブジェクト番号で区別する。解析できないコンテンツで
+    使われているかもしれないフォントはunsafeに入れ、サブセット化の対象から外す。
+    """
+    def __init__(self, pdf):
+        self.pdf = pdf
+        self.fonts = {}  # フォントのキー → フォント辞書
+        self.codes = {}  # フォントのキー → 表示に使われた文字列の集合
+        self.unsafe = set()
+        self.visited = set()
+    
+    @staticmethod
+    def font_key(ref):
+        return ref.idnum if isinstance(ref, generic.IndirectObject) else id(ref)
+    
+    def add_page(self, page):
+        resources = page.get('/Resources')
+        resources = resources.get_object() if resources is not None else generic.DictionaryObject()
+        contents = page.get('/Contents')
+        if contents is not None:
+            self.scan(contents, resources)
+        
+        # 注釈の外観ストリーム（/AP /N /R /D、状態ごとの辞書の場合もある）
+        for annotation in page.get('/Annots', None) or []:
+            appearances = annotation.get_object().get('/AP')
+            for appearance in (appearances.get_object().values() if appearances is not None else []):
+                appearance = appearance.get_object()
+                states = appearance.values() if not isinstance(appearance, generic.StreamObject) else [appearance]
+                for state in states:
+                    self.scan_form(state, resources)
+    
+    def scan_form(self, form, parent_resources):
+        form = form.get_object()
+        if not isinstance(form, generic.StreamObject) or id(form) in self.visited:
+            return
+        self.visited.add(id(form))
+        resources = form.get('/Resources')
+        resources = resources.get_object() if resources is not None else parent_resources
+        self.scan(form, resources)
+    
+    def scan(self, contents, resources):
+        """コンテンツストリーム（ストリームまたはその配列）を解析"""
+        fonts = resources.get('/Font')
+        fonts = fonts.get_object() if fonts is not None else generic.DictionaryObject()
+        xobjects = resources.get('/XObject')
+        xobjects = xobjects.get_object() if xobjects is not None else generic.DictionaryObject()
+        
+        # パターンの中の文字は解析しない代わりに、先に中身を調べる
+        patterns = resources.get('/Pattern')
+        for pattern in (patterns.get_object().values() if patterns is not None else []):
+            if pattern.get_object().get('/PatternType') == 1:
+                self.scan_form(pattern, resources)
+        
+        if not fonts and not xobjects:
+            return
+        try:
+            operations = generic.ContentStream(contents, self.pdf).operations
+        except Exception:
+            # 解析できない場合は、このリソースのフォントをすべて対象外にする
+            self.unsafe.update(self.font_key(fonts.raw_get(name)) for name in fonts)
+            return
+        
+        current = None
+        saved = []
+        for operands, operator in operations:
+            if operator == b'Tf' and operands and operands[0] in fonts:
+                ref = fonts.raw_get(operands[0])
+                current = self.font_key(ref)
+                self.fonts.setdefault(current, ref.get_object())
+            elif operator in TEXT_SHOW_OPERATORS and current is not None and operands:
+                strings = self.codes.setdefault(current, set())
+                value = operands[-1]
+                if isinstance(value, generic.ArrayObject):
+                    strings.update(text_string_bytes(item) for item in value)
+                else:
+                    strings.add(text_string_bytes(value))
+            elif operator == b'q':
+                saved.append(current)
+            elif operator == b'Q' and saved:
+                current = saved.pop()
+            elif operator == b'Do' and operands and operands[0] in xobjects:
+                xobject = xobjects[operands[0]]
+                if xobject.get('/Subtype') == '/Form':
+                    self.scan_form(xobject, resources)
+
+
+def cid_font_glyphs(font, strings):
+    """Identity-H/Vで符号化されたCIDFontType2で使われているグリフ番号の集合
+    
+    文字コードからグリフ番号を確実に求められないフォントはNoneを返す。
+    """
+    if font.get('/Subtype') != '/Type0' or font.get('/Encoding') not in ('/Identity-H', '/Identity-V'):
+        return None
+    descendant = font['/DescendantFonts'][0].get_object()
+    if descendant.get('/Subtype') != '/CIDFontType2':
+        return None
+    cid_to_gid = descendant.get('/CIDToGIDMap', '/Identity')
+    table = None if cid_to_gid == '/Identity' else cid_to_gid.get_object().get_data()
+    
+    glyphs = {0}
+    for data in strings:
+        for i in range(0, len(data) - 1, 2):
+            cid = data[i] << 8 | data[i + 1]
+            if table is None:
+                glyphs.add(cid)
+            elif 2 * cid + 1 < len(table):
+                glyphs.add(table[2 * cid] << 8 | table[2 * cid + 1])
+    return glyphs
+
+
+def subset_tag(glyphs):
+    """サブセットフォント名の先頭に付ける6文字の英大文字"""
+    digest = hashlib.sha256(repr(sorted(glyphs)).encode()).digest()
+    return ''.join(chr(ord('A') + byte % 26) for byte in digest[:6])
+
+
+def subset_truetype(data, glyphs):
+    """TrueTypeフォントを指定したグリフだけにする（グリフ番号は変えない）"""
+    options = font_subset.Options()
+    options.retain_gids = True
+    options.notdef_outline = True
+    options.ignore_missing_glyphs = True
+    options.layout_features = []
+    options.name_IDs = ['*']
+    options.name_languages = ['*']
+    font = ttLib.TTFont(io.BytesIO(data))
+    subsetter = font_subset.Subsetter(options)
+    subsetter.populate(gids=sorted(glyphs))
+    subsetter.subset(font)
+    output = io.BytesIO()
+    font.save(output)
+    return output.getvalue()
+
+
+def subset_embedded_fonts(pdf, pages):
+    """埋め込まれたCIDフォント（TrueType）を使われているグリフだけにする
+    
+    同じフォントプログラムを複数のフォントが参照している場合は、使われている
+    グリフをまとめてから1回だけサブセット化する。(サブセット化した数, 減ったバイト数) を返す。
+    """
+    # サブセット化できないテーブルを捨てたときの警告を毎回出力しない
+    logging.getLogger("fontTools.subset").setLevel(logging.ERROR)
+    collector = FontUsageCollector(pdf)
+    for page in pages:
+        collector.add_page(page)
+    
+    programs = {}  # フォントプログラムのキー → [ストリーム, グリフ番号の集合, 名前を付け替える辞書]
+    skipped = set()
+    for key, font in collector.fonts.items():
+        glyphs = None if key in collector.unsafe else cid_font_glyphs(font, collector.codes.get(key, ()))
+        try:
+            descendant = font['/DescendantFonts'][0].get_object()
+            descriptor = descendant['/FontDescriptor'].get_object()
+            program_ref = descriptor.raw_get('/FontFile2')
+        except (KeyError, IndexError, TypeError):
+            continue
+        program_key = FontUsageCollector.font_key(program_ref)
+        if glyphs is None:
+            skipped.add(program_key)
+            continue
+        entry = programs.setdefault(program_key, [program_ref.get_object(), set(), []])
+        entry[1].update(glyphs)
+        entry[2] += [font, descendant, descriptor]
+    
+    count = saved = 0
+    for program_key, (program, glyphs, named) in programs.items():
+        if program_key in skipped:
+            continue
+        try:
+            data = subset_truetype(program.get_data(), glyphs)
+        except Exception:
+            # 壊れている・対応していないフォントはそのまま残す
+            continue
+        compressed = zlib.compress(data, 9)
+        if len(compressed) >= len(program._data):
+            continue
+        saved += len(program._data) - len(compressed)
+        count += 1
+        program._data = compressed
+        program.decoded_self = None
+        program[generic.NameObject('/Filter')] = generic.NameObject('/FlateDecode')
+        program[generic.NameObject('/Length1')] = generic.NumberObject(len(data))
+        if '/DecodeParms' in program:
+            del program['/DecodeParms']
+        
+        # サブセットであることをフォント名で示す（ABCDEF+名前）
+        tag = subset_tag(glyphs)
+        for obj in named:
+            for name_key in ('/BaseFont', '/FontName'):
+                name = obj.get(name_key)
+                if name is not None and not re.match(r'/[A-Z]{6}\+', name):
+                    obj[generic.NameObject(name_key)] = generic.NameObject(f"/{tag}+{name[1:]}")
+    return count, saved
+
+
+# Flate圧縮のレベル（1: 速度優先 〜 9: 圧縮率優先、6はzlibの標準）
+DEFAULT_FLATE_LEVEL = 6
+# 圧縮しないストリーム（メタデータは検索できるよう圧縮しない）
+UNCOMPRESSED_STREAM_TYPES = ('/Metadata', '/XRef', '/ObjStm')
+
+
+def deflate_stream_data(data, level, inflate_first=False):
+    """ストリームのデータをFlate圧縮（inflate_firstなら先に展開してから圧縮し直す）"""
+    if inflate_first:
+        data = zlib.decompress(data)
+    return zlib.compress(data, level)
+
+
+def recompress_streams(pdf_writer, level=DEFAULT_FLATE_LEVEL, recompress_flate=False, report=None):
+    """書き出す前のストリームをスレッドプールで並列にFlate圧縮する
+    
+    zlibは圧縮・展開の間GILを解放するため、スレッドでも複数のコアで圧縮できる。
+    未圧縮のストリームは圧縮し、予測子のないFlateストリームはページの内容なら常に、
+    それ以外はrecompress_flateの場合に指定したレベルで圧縮し直す（小さくなった場合だけ置き換える）。
+    reportには(完了数, 全体数)を渡す。(置き換えた数, 減ったバイト数) を返す。
+    """
+    content_ids = set()
+    for page in pdf_writer.pages:
+        contents = page.raw_get('/Contents') if '/Contents' in page else None
+        if isinstance(contents, generic.IndirectObject) and isinstance(contents.get_object(), generic.ArrayObject):
+            contents = contents.get_object()
+        refs = contents if isinstance(contents, generic.ArrayObject) else [contents]
+        content_ids.update(ref.idnum for ref in refs if isinstance(ref, generic.IndirectObject))
+    
+    jobs = []
+    for i, obj in enumerate(pdf_writer._objects):
+        if not isinstance(obj, generic.StreamObject) or obj.get('/Type') in UNCOMPRESSED_STREAM_TYPES:
+            continue
+        filters = obj.get('/Filter')
+        if isinstance(filters, generic.ArrayObject) and len(filters) == 1:
+            filters = filters[0]
+        if filters is None:
+            # ContentStreamは命令の列から直列化する
+            data = obj.get_data()
+            jobs.append((i, data, False, len(data)))
+        elif (filters == '/FlateDecode' and '/DecodeParms' not in obj
+              and (recompress_flate or i + 1 in content_ids)):
+            jobs.append((i, obj._data, True, len(obj._data)))
+    if not jobs:
+        return 0, 0
+    
+    count = saved = 0
+    with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as executor:
+        futures = [(i, original_size, executor.submit(deflate_stream_data, data, level, inflate_first))
+                   for i, data, inflate_first, original_size in jobs]
+        for done, (i, original_size, future) in enumerate(futures, start=1):
+            try:
+                compressed = future.result()
+            except zlib.error:
+                # 壊れたFlateストリームはそのまま残す
+                continue
+            if len(compressed) < original_size:
+                obj = pdf_writer._objects[i]
+                stream = generic.EncodedStreamObject()
+                stream.update({key: value for key, value in obj.items()
+                               if key not in ('/Filter', '/DecodeParms', '/Length')})
+                stream[generic.NameObject('/Filter')] = generic.NameObject('/FlateDecode')
+                stream._data = compressed
+                stream.indirect_reference = obj.indirect_reference
+                pdf_writer._objects[i] = stream
+                count += 1
+                saved += original_size - len(compressed)
+            if report is not None:
+                report(done, len(futures))
+    return count, saved
+
+
+class ObjectSizeEstimator:
+    """書き出した時の各間接オブジェクトのおおよそのバイト数を求める
+    
+    通常のオブジェクトはxrefのオフセットの差から、オブジェクトストリーム内の
+    オブジェクト（ストリームを含まない小さな辞書）はその場で直列化して求める。
+    試し書きをせずにページごとの出力サイズを見積もるために使う。
+    """
+    # 「N 0 obj」「endobj」とxrefの1行分
+    OBJECT_OVERHEAD = 40
+    # ヘッダー・カタログ・ページツリー・トレーラーなど
+    FILE_OVERHEAD = 1024
+    
+    def __init__(self, reader):
+        self.reader = reader
+        self.sizes = {}
+        
+        offsets = sorted(
+            (offset, idnum)
+            for entries in reader.xref.values()
+            for idnum, offset in entries.items()
+        )
+        stream = reader.stream
+        position = stream.tell()
+        stream.seek(0, os.SEEK_END)
+        file_size = self.file_size = stream.tell()
+        # 最後のオブジェクトにxref表とトレーラーを含めないよう、最後のxrefの位置で区切る
+        stream.seek(max(0, file_size - 1024))
+        match = re.search(rb'startxref\s+(\d+)', stream.read())
+        stream.seek(position)
+        end_of_objects = int(match.group(1)) if match else file_size
+        
+        for i, (offset, idnum) in enumerate(offsets):
+            end = offsets[i + 1][0] if i + 1 < len(offsets) else file_size
+            if offset < end_of_objects < end:
+                end = end_of_objects
+            self.sizes[idnum] = max(0, end - offset)
+    
+    def stored_size(self, idnum):
+        """ファイル内でオブジェクトが占めるバイト数（オブジェクトストリーム内は直列化した長さ）"""
+        size = self.sizes.get(idnum)
+        if size is None:
+            buffer = io.BytesIO()
+            self.reader.get_object(generic.IndirectObject(idnum, 0, self.reader)).write_to_stream(buffer, None)
+            size = self.sizes[idnum] = len(buffer.getvalue())
+        return size
+    
+    def object_size(self, idnum):
+        return self.stored_size(idnum) + self.OBJECT_OVERHEAD
+    
+    def page_objects(self, page):
+        """ページから参照される間接オブジェクトの番号の集合（他のページはたどらない）"""
+        found = set()
+        if page.indirect_reference is not None:
+            found.add(page.indirect_reference.idnum)
+        stack = list(page.values())
+        while stack:
+            obj = stack.pop()
+            if isinstance(obj, generic.IndirectObject):
+                if obj.idnum in found:
+                    continue
+                found.add(obj.idnum)
+                obj = obj.get_object()
+                if isinstance(obj, generic.DictionaryObject) and obj.get('/Type') in ('/Page', '/Pages'):
+                    found.discard(obj.indirect_reference.idnum if obj.indirect_reference else None)
+                    continue
+            if isinstance(obj, generic.DictionaryObject):
+                stack.extend(value for key, value in obj.items() if key not in ('/Parent', '/P'))
+            elif isinstance(obj, generic.ArrayObject):
+                stack.extend(obj)
+        return found
+
+
+class ObjectDigester:
+    """参照先も含めたオブジェクトの内容からハッシュ値を求める
+    
+    間接参照は参照先のハッシュ値に置き換えて計算するため、別々のファイルに
+    含まれる同じフォントや画像も同じ値になる。
+    """
+    # ページツリーや親をたどらないようにするキー
+    SKIP_KEYS = ('/Parent', '/P')
+    
+    def __init__(self):
+        self.memo = {}
+        self.in_progress = set()
+    
+    def digest(self, obj):
+        hasher = hashlib.sha256()
+        self._feed(obj, hasher)
+        return hasher.digest()
+    
+    def _feed(self, obj, hasher):
+        if isinstance(obj, generic.IndirectObject):
+            key = (id(obj.pdf), obj.idnum)
+            digest = self.memo.get(key)
+            if digest is None:
+                if key in self.in_progress:
+                    # 循環参照は番号で区別する
+                    hasher.update(b'R%d:%d' % key)
+                    return
+                self.in_progress.add(key)
+                digest = self.memo[key] = self.digest(obj.get_object())
+                self.in_progress.discard(key)
+            hasher.update(b'R' + digest)
+        elif isinstance(obj, generic.DictionaryObject):
+            hasher.update(b'<<')
+            for key in sorted(obj.keys()):
+                if key in self.SKIP_KEYS or (key == '/Length' and isinstance(obj, generic.StreamObject)):
+                    continue
+                hasher.update(key.encode('utf-8'))
+                self._feed(obj[key], hasher)
+            hasher.update(b'>>')
+            if isinstance(obj, generic.StreamObject):
+                hasher.update(b'stream' + hashlib.sha256(obj._data).digest())
+        elif isinstance(obj, generic.ArrayObject):
+            hasher.update(b'[')
+            for item in obj:
+                self._feed(item, hasher)
+            hasher.update(b']')
+        else:
+            buffer = io.BytesIO()
+            obj.write_to_stream(buffer, None)
+            hasher.update(type(obj).__name__.encode() + buffer.getvalue())
+
+
+# ページごとに1つである必要があるため共有しないオブジェクトの種類
+UNSHAREABLE_TYPES = ('/Page', '/Pages', '/Catalog', '/Annot', '/Outlines',
+                     '/StructTreeRoot', '/StructElem', '/Sig')
+
+
+def share_duplicate_objects(pdf_writer):
+    """内容が同じオブジェクトを1つにまとめ、すべての参照をそれに付け替える
+    
+    まとめられたオブジェクトの番号にはnullを書き出す。まとめた数を返す。
+    """
+    digester = ObjectDigester()
+    first_seen = {}
+    replace = {}
+    
+    for i, obj in enumerate(pdf_writer._objects):
+        if obj is None or not isinstance(obj, (generic.DictionaryObject, generic.ArrayObject)):
+            continue
+        if isinstance(obj, generic.DictionaryObject) and (
+                obj.get('/Type') in UNSHAREABLE_TYPES
+                or any(key in obj for key in ('/Rect', '/Parent', '/P'))):
+            continue
+        idnum = i + 1
+        digest = digester.digest(generic.IndirectObject(idnum, 0, pdf_writer))
+        canonical = first_seen.setdefault(digest, idnum)
+        if canonical != idnum:
+            replace[idnum] = canonical
+    
+    if not replace:
+        return 0
+    
+    def replace_references(obj):
+        items = obj.items() if isinstance(obj, generic.DictionaryObject) else enumerate(obj)
+        for key, value in list(items):
+            if isinstance(value, generic.IndirectObject):
+                if value.pdf is pdf_writer and value.idnum in replace:
+                    obj[key] = generic.IndirectObject(replace[value.idnum], 0, pdf_writer)
+            elif isinstance(value, (generic.DictionaryObject, generic.ArrayObject)):
+                replace_references(value)
+    
+    for i, obj in enumerate(pdf_writer._objects):
+        if i + 1 in replace:
+            pdf_writer._objects[i] = generic.NullObject()
+        elif isinstance(obj, (generic.DictionaryObject, generic.ArrayObject)):
+            replace_references(obj)
+    return len(replace)
+
+
+def format_size(size):
+    """バイト数を読みやすい単位の文字列にする"""
+    for unit in ('B', 'KB', 'MB'):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.2f} GB"
+
+
+# 画像のフィルターと表示名
+IMAGE_CODEC_NAMES = {
+    '/DCTDecode': 'JPEG', '/JPXDecode': 'JPEG2000', '/CCITTFaxDecode': 'CCITT',
+    '/JBIG2Decode': 'JBIG2', '/FlateDecode': 'Flate', '/LZWDecode': 'LZW',
+    '/RunLengthDecode': 'RunLength',
+}
+# 画像の解像度の区分（長辺のピクセル数の上限と表示名）
+IMAGE_SIZE_CLASSES = ((500, '〜500px'), (1500, '〜1500px'), (3000, '〜3000px'), (None, '3000px超'))
+FONT_FILE_KEYS = ('/FontFile', '/FontFile2', '/FontFile3')
+
+
+class SizeAnalysis(NamedTuple):
+    """PDFのサイズの内訳"""
+    file_size: int
+    categories: dict  # 分類名 → [オブジェクト数, バイト数]
+    largest: list  # (バイト数, オブジェクト番号, 説明) の大きい順
+    duplicate_count: int  # 他と内容が同じストリームの数
+    duplicate_bytes: int  # まとめれば減らせるバイト数
+
+
+def image_description(obj):
+    """画像の形式と解像度の区分を表す文字列"""
+    filters = obj.get('/Filter')
+    if isinstance(filters, generic.ArrayObject):
+        filters = filters[-1] if filters else None
+    codec = IMAGE_CODEC_NAMES.get(filters, '非圧縮' if filters is None else str(filters)[1:])
+    longest = max(int(obj.get('/Width', 0)), int(obj.get('/Height', 0)))
+    size_class = next(label for limit, label in IMAGE_SIZE_CLASSES if limit is None or longest <= limit)
+    return f"画像 {codec} {size_class}"
+
+
+def analyze_pdf_size(reader, largest_count=10):
+    """すべての間接オブジェクトを1回ずつ調べ、種類ごとのバイト数と大きいオブジェクトを求める
+    
+    オブジェクトのサイズはObjectSizeEstimatorの見積もりを使う。内容が同じストリームは
+    ObjectDigesterで検出し、重複として数える（share_duplicate_objectsでまとめられる量）。
+    """
+    estimator = ObjectSizeEstimator(reader)
+    
+    # ページの内容ストリームとフォントプログラムは参照元から分類する
+    content_ids = set()
+    for page in reader.pages:
+        refs = [page.raw_get('/Contents')] if '/Contents' in page else []
+        if isinstance(refs and refs[0].get_object(), generic.ArrayObject):
+            refs = list(refs[0].get_object())
+        content_ids.update(ref.idnum for ref in refs if isinstance(ref, generic.IndirectObject))
+    
+    info = reader.trailer.raw_get('/Info') if '/Info' in reader.trailer else None
+    info_id = info.idnum if isinstance(info, generic.IndirectObject) else None
+    
+    idnums = sorted((set(estimator.sizes) | set(reader.xref_objStm)) - {0})
+    font_files = {}
+    objects = []
+    for idnum in idnums:
+        try:
+            obj = reader.get_object(generic.IndirectObject(idnum, 0, reader))
+        except Exception:
+            continue
+        if obj is None or isinstance(obj, generic.NullObject):
+            continue
+        objects.append((idnum, obj))
+        if isinstance(obj, generic.DictionaryObject) and obj.get('/Type') == '/FontDescriptor':
+            font_name = str(obj.get('/FontName', ''))
+            subset = re.match(r'/?[A-Z]{6}\+', font_name) is not None
+            for key in FONT_FILE_KEYS:
+                ref = obj.raw_get(key) if key in obj else None
+                if isinstance(ref, generic.IndirectObject):
+                    font_files[ref.idnum] = 'フォント（サブセット）' if subset else 'フォント（全体を埋め込み）'
+    
+    # オブジェクトストリーム内のオブジェクトには、圧縮後の入れ物のサイズを直列化した長さの比で割り振る
+    sizes = {idnum: estimator.stored_size(idnum) for idnum, _ in objects}
+    members = {}
+    for idnum, (stream_num, _) in reader.xref_objStm.items():
+        if idnum in sizes:
+            members.setdefault(stream_num, []).append(idnum)
+    for stream_num, member_ids in members.items():
+        serialized = sum(sizes[idnum] for idnum in member_ids)
+        if serialized:
+            ratio = estimator.stored_size(stream_num) / serialized
+            for idnum in member_ids:
+                sizes[idnum] = int(sizes[idnum] * ratio)
+    
+    digester = ObjectDigester()
+    first_seen = set()
+    categories = {}
+    largest = []
+    duplicate_count = duplicate_bytes = 0
+    for idnum, obj in objects:
+        if isinstance(obj, generic.StreamObject):
+            object_type = obj.get('/Type')
+            if object_type in ('/ObjStm', '/XRef'):
+                # 中のオブジェクトはそれぞれ数えるため、入れ物自体は数えない
+                continue
+            subtype = obj.get('/Subtype')
+            if subtype == '/Image':
+                category = image_description(obj)
+            elif idnum in font_files:
+                category = font_files[idnum]
+            elif idnum in content_ids:
+                category = 'ページの内容'
+            elif subtype == '/Form':
+                category = 'フォームXObject'
+            elif object_type == '/Metadata':
+                category = 'メタデータ'
+            else:
+                category = 'その他のストリーム'
+        elif isinstance(obj, generic.DictionaryObject) and obj.get('/Type') in ('/Font', '/FontDescriptor'):
+            category = 'フォント（辞書）'
+        elif idnum == info_id:
+            category = 'メタデータ'
+        else:
+            category = '構造（ページ・辞書など）'
+        
+        size = sizes[idnum]
+        entry = categories.setdefault(category, [0, 0])
+        entry[0] += 1
+        entry[1] += size
+        largest.append((size, idnum, category))
+        
+        if isinstance(obj, generic.StreamObject):
+            digest = digester.digest(generic.IndirectObject(idnum, 0, reader))
+            if digest in first_seen:
+                duplicate_count += 1
+                duplicate_bytes += size
+            else:
+                first_seen.add(digest)
+    
+    largest.sort(reverse=True)
+    return SizeAnalysis(estimator.file_size, categories, largest[:largest_count],
+                        duplicate_count, duplicate_bytes)
+
+
+def format_size_analysis(analysis):
+    """サイズの内訳を表示用の文字列にする"""
+    total = max(analysis.file_size, 1)
+    lines = [f"ファイルサイズ: {format_size(analysis.file_size)}", "", "種類ごとのサイズ:"]
+    for category, (count, size) in sorted(analysis.categories.items(), key=lambda item: -item[1][1]):
+        lines.append(f"  {category}: {format_size(size)} ({size / total:.1%}, {count}個)")
+    lines.append("")
+    if analysis.duplicate_count:
+        lines.append(f"重複: 内容が同じストリームが{analysis.duplicate_count}個"
+                     f"（まとめると約{format_size(analysis.duplicate_bytes)}減らせます）")
+    else:
+        lines.append("重複: なし")
+    lines += ["", "大きいオブジェクト:"]
+    for size, idnum, category in analysis.largest:
+        lines.append(f"  {idnum} 0 obj: {format_size(size)} ({category})")
+    return "\n".join(lines)
+
+
+def get_app_data_dir():
+    """アプリのデータ（インデックスなど）を保存するフォルダを取得"""
+    base = os.environ.get('LOCALAPPDATA') or os.path.join(Path.home(), '.local', 'share')
+    path = os.path.join(base, 'PDF-Tool-Pro')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def format_duration(seconds):
+    """秒数を「時:分:秒」または「分:秒」の形式にする"""
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+
+class JobMetrics:
+    """処理の進み具合から速度・経過時間・残り時間を計算する"""
+    # 残り時間の計算に使う速度を更新する間隔（秒）と、指数移動平均の係数
+    SAMPLE_INTERVAL = 0.5
+    SMOOTHING = 0.3
+    
+    def __init__(self, mode, files):
+        self.mode = mode
+        self.file_count = len(files)
+        self.input_bytes = sum(os.path.getsize(f) for f in files if os.path.isfile(f))
+        self.output_bytes = 0
+        self.started = time.monotonic()
+        self.fraction = 0.0
+        self.pages = 0
+        self.current_file = ""
+        self.current_page = None
+        self._sample_time = self.started
+        self._sample_fraction = 0.0
+        self._rate = None  # 1秒あたりに進む割合（平滑化済み）
+    
+    def update(self, fraction, file_path=None, page_num=None, pages=1):
+        """進み具合（0〜1）と処理したページ数を記録"""
+        now = time.monotonic()
+        self.fraction = min(max(fraction, self.fraction), 1.0)
+        self.pages += pages
+        if file_path is not None:
+            self.current_file = Path(file_path).name
+            self.current_page = page_num
+        
+        interval = now - self._sample_time
+        if interval >= self.SAMPLE_INTERVAL and self.fraction > self._sample_fraction:
+            rate = (self.fraction - self._sample_fraction) / interval
+            if self._rate is None:
+                self._rate = rate
+            else:
+                self._rate = self.SMOOTHING * rate + (1 - self.SMOOTHING) * self._rate
+            self._sample_time, self._sample_fraction = now, self.fraction
+    
+    def add_output(self, size):
+        """書き出したファイルのバイト数を記録"""
+        self.output_bytes += size
+    
+    def snapshot(self):
+        """現在の状態を辞書で取得（シグナルやJSONでそのまま渡せる）"""
+        elapsed = time.monotonic() - self.started
+        rate = self._rate
+        if rate is None and elapsed > 0 and self.fraction > 0:
+            rate = self.fraction / elapsed
+        return {
+            "mode": self.mode,
+            "fraction": self.fraction,
+            "elapsed": elapsed,
+            "eta": (1.0 - self.fraction) / rate if rate else None,
+            "pages": self.pages,
+            "pages_per_second": self.pages / elapsed if elapsed > 0 else 0.0,
+            "mb_per_second": self.input_bytes * self.fraction / elapsed / 1e6 if elapsed > 0 else 0.0,
+            "current_file": self.current_file,
+            "current_page": self.current_page,
+            "output_bytes": self.output_bytes,
+        }
+    
+    def summary(self, success, message, output_path):
+        """履歴に保存する処理の結果"""
+        snapshot = self.snapshot()
+        # リニアライズなどで書き込み後に置き換えた場合は、最終的なファイルのサイズを使う
+        output_bytes = os.path.getsize(output_path) if os.path.isfile(output_path) else self.output_bytes
+        return {
+            "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "mode": self.mode,
+            "success": success,
+            "message": message,
+            "files": self.file_count,
+            "pages": self.pages,
+            "input_bytes": self.input_bytes,
+            "output_bytes": output_bytes,
+            "elapsed": round(snapshot["elapsed"], 3),
+            "pages_per_second": round(snapshot["pages_per_second"], 2),
+            "mb_per_second": round(snapshot["mb_per_second"], 3),
+        }
+
+
+JOB_HISTORY_MAX_BYTES = 5 * 1024 * 1024
+_job_history_lock = threading.Lock()
+
+
+def append_job_history(entry):
+    """処理の結果を履歴ファイル（JSON Lines）に追記（大きくなったら古い履歴と入れ替える）"""
+    path = os.path.join(get_app_data_dir(), 'job_history.jsonl')
+    with _job_history_lock:
+        try:
+            if os.path.getsize(path) > JOB_HISTORY_MAX_BYTES:
+                os.replace(path, path + '.1')
+        except OSError:
+            pass
+        with open(path, 'a', encoding='utf-8') as history:
+            history.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def file_content_hash(file_path):
+    """ファイルの内容のハッシュ値を取得（ファイル名や場所が変わっても同じ値になる）"""
+    hasher = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def extract_page_texts(file_path, first, last):
+    """指定範囲のページのテキストを抽出（プロセスプールから呼び出す）"""
+    with open(file_path, 'rb') as pdf_file:
+        pdf_reader = PyPDF2.PdfReader(pdf_file)
+        texts = []
+        for page_num in range(first, last):
+            try:
+                text = pdf_reader.pages[page_num].extract_text() or ''
+            except Exception:
+                # 抽出できないページは空として扱う
+                text = ''
+            texts.append((page_num, text))
+        return texts
+
+
+class PageTextIndex:
+    """ページのテキストの全文検索インデックス（SQLite FTS5）
+    
+    ファイルの内容のハッシュ値ごとに保存するため、一度インデックスを作った
+    ファイルは名前が変わっても作り直さない。
+    """
+    def __init__(self, db_path=None):
+        if db_path is None:
+            db_path = os.path.join(get_app_data_dir(), 'text_index.sqlite3')
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "doc_hash TEXT PRIMARY KEY, page_count INTEGER, indexed_at REAL)")
+        try:
+            # 日本語は単語の区切りがないため3文字単位（trigram）で索引を作る
+            self.connection.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS page_texts USING fts5("
+                "doc_hash UNINDEXED, page UNINDEXED, text, tokenize='trigram')")
+            self.use_fts = True
+        except sqlite3.OperationalError:
+            # FTS5やtrigramが使えないSQLiteでは通常のテーブルとLIKE検索にする
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS page_texts_plain ("
+                "doc_hash TEXT, page INTEGER, text TEXT)")
+            self.use_fts = False
+        self.table = "page_texts" if self.use_fts else "page_texts_plain"
+        self.connection.commit()
+    
+    def close(self):
+        self.connection.close()
+    
+    def has_document(self, doc_hash):
+        row = self.connection.execute(
+            "SELECT 1 FROM documents WHERE doc_hash = ?", (doc_hash,)).fetchone()
+        return row is not None
+    
+    def add_document(self, doc_hash, texts):
+        """ページのテキストを登録（texts は (ページ番号, テキスト) のリスト）"""
+        with self.connection:
+            self.connection.execute(f"DELETE FROM {self.table} WHERE doc_hash = ?", (doc_hash,))
+            self.connection.executemany(
+                f"INSERT INTO {self.table} (doc_hash, page, text) VALUES (?, ?, ?)",
+                ((doc_hash, page_num, text) for page_num, text in texts))
+            self.connection.execute(
+                "INSERT OR REPLACE INTO documents VALUES (?, ?, ?)",
+                (doc_hash, len(texts), time.time()))
+    
+    def search(self, doc_hash, query):
+        """空白で区切った語をすべて含むページ番号（0始まり）のリストを取得"""
+        terms = query.split()
+        if not terms:
+            return []
+        
+        if self.use_fts and all(len(term) >= 3 for term in terms):
+            match = " AND ".join('"' + term.replace('"', '""') + '"' for term in terms)
+            rows = self.connection.execute(
+                "SELECT page FROM page_texts WHERE page_texts MATCH ? AND doc_hash = ?",
+                (match, doc_hash))
+        else:
+            # trigramは3文字未満の語を検索できないためLIKEで探す
+            conditions = " AND ".join("text LIKE ? ESCAPE '\\'" for _ in terms)
+            patterns = ['%' + re.sub(r'([%_\\])', r'\\\1', term) + '%' for term in terms]
+            rows = self.connection.execute(
+                f"SELECT page FROM {self.table} WHERE doc_hash = ? AND {conditions}",
+                [doc_hash] + patterns)
+        return sorted(row[0] for row in rows)
+
+
+class TextIndexThread(QThread):
+    """ページのテキストを抽出してインデックスを作成"""
+    progress = Signal(int)
+    index_ready = Signal(str)
+    index_failed = Signal(str)
+    
+    CHUNK_PAGES = 25
+    # これより少ないページ数ではプロセスを起動せずにこのスレッドで抽出する
+    POOL_MIN_PAGES = 100
+    
+    def __init__(self, pdf_path, page_count):
+        super().__init__()
+        self.pdf_path = pdf_path
+        self.page_count = page_count
+    
+    def run(self):
+        try:
+            doc_hash = file_content_hash(self.pdf_path)
+            index = PageTextIndex()
+            try:
+                if not index.has_document(doc_hash):
+                    index.add_document(doc_hash, self.extract_texts())
+            finally:
+                index.close()
+            self.index_ready.emit(doc_hash)
+        except Exception as e:
+            self.index_failed.emit(str(e))
+    
+    def extract_texts(self):
+        """ページのテキストを並列に抽出"""
+        ranges = [(first, min(first + self.CHUNK_PAGES, self.page_count))
+                  for first in range(0, self.page_count, self.CHUNK_PAGES)]
+        texts = []
+        
+        if self.page_count < self.POOL_MIN_PAGES:
+            for idx, (first, last) in enumerate(ranges):
+                texts.extend(extract_page_texts(self.pdf_path, first, last))
+                self.progress.emit(int((idx + 1) / len(ranges) * 100))
+            return texts
+        
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+            futures = [executor.submit(extract_page_texts, self.pdf_path, first, last)
+                       for first, last in ranges]
+            for idx, future in enumerate(futures):
+                if self.isInterruptionRequested():
+                    for pending in futures:
+                        pending.cancel()
+                    raise Exception("インデックスの作成を中止しました")
+                texts.extend(future.result())
+                self.progress.emit(int((idx + 1) / len(ranges) * 100))
+        return texts
+
+
+class PageRef(NamedTuple):
+    """出力する1ページ分の指定（元ファイル・ページ番号・追加の回転角度）"""
+    source: str
+    page: int = None  # 0始まり。Noneの場合は全ページ
+    rotation: int = 0
+
+
 class PDFProcessThread(QThread):
     """PDFの処理を別スレッドで実行"""
     progress = Signal(int)
+    metrics = Signal(dict)
     finished = Signal(bool, str)
+    # 速度・残り時間を通知する最短の間隔（秒）
+    METRICS_INTERVAL = 0.25
+    # 統合の入力を先読みするスレッド数と、メモリに読み込むファイルサイズの上限
+    PREFETCH_WORKERS = 8
+    PREFETCH_MAX_FILE_BYTES = 64 * 1024 * 1024
+    PREFETCH_TOTAL_BYTES = 512 * 1024 * 1024
+    # 先読みが全体の進捗に占める割合
+    PREFETCH_PROGRESS = 0.3
     
     def __init__(self, mode, files, output_path, **kwargs):
         super().__init__()
@@ -27,13 +1713,54 @@ class PDFProcessThread(QThread):
         self.files = files
         self.output_path = output_path
         self.kwargs = kwargs
+        self._readers = {}
+        self._open_files = []
+        self.notes = []  # 完了時に利用者へ知らせる注意事項
+        self.job_metrics = None
+        self._metrics_emitted = 0.0
     
     def run(self):
+        try:
+            self.process()
+            self.finished.emit(True, self.completion_message("処理が完了しました！"))
+        except Exception as e:
+            self.finished.emit(False, f"エラーが発生しました: {str(e)}")
+    
+    def completion_message(self, message):
+        """完了メッセージに処理中の注意事項を付け加える"""
+        return "\n".join([message] + self.notes)
+    
+    def report_progress(self, fraction, file_path=None, page_num=None, pages=1):
+        """進捗率（0〜1）を通知し、速度・残り時間は一定の間隔で通知する"""
+        self.progress.emit(int(fraction * 100))
+        self.job_metrics.update(fraction, file_path, page_num, pages)
+        now = time.monotonic()
+        if fraction >= 1.0 or now - self._metrics_emitted >= self.METRICS_INTERVAL:
+            self._metrics_emitted = now
+            self.metrics.emit(self.job_metrics.snapshot())
+    
+    def open_output(self, path, mode='wb'):
+        """出力ファイルを開く（一時ファイルに書き込み、完了したら置き換える。fsyncはkwargsで指定）"""
+        return AtomicOutputFile(path, fsync=self.kwargs.get('fsync', False), mode=mode,
+                                on_commit=self.job_metrics.add_output)
+    
+    def record_history(self, success, message):
+        """処理の結果を履歴に残す（履歴の保存に失敗しても処理は失敗にしない）"""
+        try:
+            append_job_history(self.job_metrics.summary(success, message, self.output_path))
+        except OSError:
+            pass
+    
+    def process(self):
+        """モードに応じた処理を実行（呼び出し元のスレッドで実行し、失敗時は例外を送出）"""
+        self.job_metrics = JobMetrics(self.mode, self.files)
         try:
             if self.mode == "merge":
                 self.merge_pdfs()
             elif self.mode == "convert":
                 self.convert_to_images()
+            elif self.mode == "images_to_pdf":
+                self.images_to_pdf()
             elif self.mode == "split":
                 self.split_pdf()
             elif self.mode == "compress":
@@ -42,86 +1769,456 @@ class PDFProcessThread(QThread):
                 self.rotate_pdf()
             elif self.mode == "extract_pages":
                 self.extract_pages()
-            self.finished.emit(True, "処理が完了しました！")
+            elif self.mode == "pipeline":
+                self.run_pipeline(self.kwargs.get('page_refs', []))
+            else:
+                raise ValueError(f"不明な処理モードです: {self.mode}")
         except Exception as e:
-            self.finished.emit(False, f"エラーが発生しました: {str(e)}")
+            self.record_history(False, str(e))
+            raise
+        finally:
+            self._close_readers()
+        # 進捗1.0の通知は出力の書き出し前なので、書き出したバイト数を含めて最終の状態を通知する
+        self.metrics.emit(self.job_metrics.snapshot())
+        self.record_history(True, self.completion_message("完了"))
     
-    def merge_pdfs(self):
-        """複数のPDFを1つにまとめる（パスワード付き）"""
+    def _open_reader(self, file_path):
+        """PDFを開く（同じファイルは1回だけ読み込む）"""
+        reader = self._readers.get(file_path)
+        if reader is None:
+            try:
+                pdf_file = open(file_path, 'rb')
+                self._open_files.append(pdf_file)
+                reader = PyPDF2.PdfReader(pdf_file)
+            except Exception as e:
+                raise Exception(f"ファイル '{Path(file_path).name}' の処理中にエラー: {str(e)}")
+            self._readers[file_path] = reader
+        return reader
+    
+    def _close_readers(self):
+        """開いているPDFをすべて閉じる"""
+        for pdf_file in self._open_files:
+            pdf_file.close()
+        self._open_files.clear()
+        self._readers.clear()
+    
+    def run_pipeline(self, page_refs, prune_resources=False, share_objects=False, progress_start=0.0):
+        """ページ指定のリストから1回の読み込み・1回の書き込みでPDFを作成
+        
+        各ページに回転を指定でき、最後に必要ならパスワードを設定する。
+        統合・回転・抽出はすべてこの処理で行う。prune_resourcesがTrueの場合は
+        各ページで使われていないリソースを出力せず、share_objectsがTrueの場合は
+        内容が同じフォント・画像・コンテンツストリームを1回だけ書き出す。
+        kwargsのskip_duplicate_pagesがTrueなら、内容が同じページは最初の1回だけ含める。
+        """
+        page_refs = [PageRef(*ref) for ref in page_refs]
         pdf_writer = PyPDF2.PdfWriter()
-        total_files = len(self.files)
+        total_refs = len(page_refs)
+        skip_duplicates = self.kwargs.get('skip_duplicate_pages', False)
+        digester = ObjectDigester()
+        seen_pages = set()
         
-        for idx, file_path in enumerate(self.files):
+        for idx, ref in enumerate(page_refs):
+            pdf_reader = self._open_reader(ref.source)
+            
             try:
-                with open(file_path, 'rb') as pdf_file:
-                    pdf_reader = PyPDF2.PdfReader(pdf_file)
-                    
-                    for page in pdf_reader.pages:
-                        pdf_writer.add_page(page)
+                if ref.page is None:
+                    pages = pdf_reader.pages
+                elif 0 <= ref.page < len(pdf_reader.pages):
+                    pages = [pdf_reader.pages[ref.page]]
+                else:
+                    pages = []
+                
+                for page in pages:
+                    if skip_duplicates:
+                        page_key = (digester.digest(page), ref.rotation % 360)
+                        if page_key in seen_pages:
+                            continue
+                        seen_pages.add(page_key)
+                    if prune_resources:
+                        prune_page_resources(page)
+                    # 回転は出力側のページに適用する（元のページは変更しない）
+                    new_page = pdf_writer.add_page(page)
+                    if ref.rotation:
+                        new_page.rotate(ref.rotation)
             except Exception as e:
-                raise Exception(f"ファイル '{Path(file_path).name}' の処理中にエラー: {str(e)}")
+                raise Exception(f"ファイル '{Path(ref.source).name}' の処理中にエラー: {str(e)}")
             
-            progress = int((idx + 1) / total_files * 100)
-            self.progress.emit(progress)
+            self.report_progress(progress_start + (1 - progress_start) * (idx + 1) / total_refs, ref.source,
+                                 None if ref.page is None else ref.page + 1, len(pages))
+        
+        if share_objects:
+            share_duplicate_objects(pdf_writer)
         
         # パスワード設定
         password = self.kwargs.get('password')
         if password:
             pdf_writer.encrypt(password)
         
-        with open(self.output_path, 'wb') as output_file:
+        with self.open_output(self.output_path) as output_file:
             pdf_writer.write(output_file)
+        self.linearize_output()
+    
+    def linearize_output(self):
+        """kwargsのlinearizeがTrueなら出力PDFをリニアライズ（qpdfがなければ注意事項に残す）"""
+        if not self.kwargs.get('linearize'):
+            return
+        if shutil.which("qpdf") is None:
+            self.notes.append("⚠️ qpdfが見つからないため、Web表示用の最適化（リニアライズ）は行いませんでした")
+            return
+        linearize_pdf(self.output_path, self.kwargs.get('password'))
+    
+    def merge_pdfs(self):
+        """複数のPDFを1つにまとめる（パスワード付き、同じ内容のオブジェクトは共有）"""
+        self.prefetch_readers(self.files)
+        self.run_pipeline([PageRef(file_path) for file_path in self.files], share_objects=True,
+                          progress_start=self.PREFETCH_PROGRESS)
+    
+    def prefetch_readers(self, file_paths):
+        """入力PDFを並列に読み込んで解析し、読み込めないファイルはまとめて報告する
+        
+        小さいファイルは全体を一度にメモリへ読み込み、ネットワーク越しでも
+        待ち時間が重なるようにする。解析済みのリーダーは_open_readerで再利用される。
+        """
+        budget = self.PREFETCH_TOTAL_BYTES
+        jobs = []
+        for file_path in dict.fromkeys(file_paths):
+            if file_path in self._readers:
+                continue
+            try:
+                size = os.path.getsize(file_path)
+            except OSError:
+                size = None
+            in_memory = size is not None and size <= min(self.PREFETCH_MAX_FILE_BYTES, budget)
+            if in_memory:
+                budget -= size
+            jobs.append((file_path, in_memory))
+        if not jobs:
+            return
+        
+        errors = []
+        with ThreadPoolExecutor(max_workers=min(self.PREFETCH_WORKERS, len(jobs))) as executor:
+            futures = [(file_path, executor.submit(self._load_reader, file_path, in_memory))
+                       for file_path, in_memory in jobs]
+            # 結果は指定された順に受け取る（書き込みも同じ順で行う）
+            for done, (file_path, future) in enumerate(futures, start=1):
+                try:
+                    stream, reader = future.result()
+                except Exception as e:
+                    errors.append(f"・{Path(file_path).name}: {str(e)}")
+                else:
+                    self._open_files.append(stream)
+                    self._readers[file_path] = reader
+                self.report_progress(done / len(futures) * self.PREFETCH_PROGRESS, file_path, pages=0)
+        
+        if errors:
+            raise Exception(f"読み込めないファイルが{len(errors)}件あります:\n" + "\n".join(errors))
+    
+    @staticmethod
+    def _load_reader(file_path, in_memory):
+        """PDFを開いてページツリーまで解析（in_memoryならファイル全体を一度に読み込む）"""
+        if in_memory:
+            with open(file_path, 'rb') as pdf_file:
+                stream = io.BytesIO(pdf_file.read())
+        else:
+            stream = open(file_path, 'rb')
+        try:
+            reader = PyPDF2.PdfReader(stream)
+            # ページツリーを解析して、壊れていないか・暗号化されていないかを確認する
+            len(reader.pages)
+            if reader.pages:
+                reader.pages[0].get_contents()
+        except Exception:
+            stream.close()
+            raise
+        return stream, reader
     
     def convert_to_images(self):
         """PDFを画像に変換"""
         image_format = self.kwargs.get('image_format', 'PNG')
         dpi = self.kwargs.get('dpi', 200)
+        if image_format not in IMAGE_OUTPUT_FORMATS:
+            raise ValueError(f"不明な出力形式です: {image_format}")
+        output_format = IMAGE_OUTPUT_FORMATS[image_format]
+        downsample = max(int(self.kwargs.get('downsample', 1)), 1)
+        color_detection = self.kwargs.get('color_detection', 'color')
+        if color_detection not in COLOR_DETECTION_MODES:
+            raise ValueError(f"不明な色の指定です: {color_detection}")
+        # 色の指定はカラーの出力形式にだけ適用する（グレースケール・2値の形式はそのまま）
+        color_mode = output_format.color_mode
+        if color_mode == 'rgb' and color_detection in ('gray', 'bilevel'):
+            color_mode = color_detection
+        postprocess = {
+            'threshold': self.kwargs.get('threshold'),
+            'auto_crop': bool(self.kwargs.get('auto_crop', False)),
+            'downsample': downsample,
+        }
+        governor = RenderMemoryGovernor(color_mode, downsample)
         total_files = len(self.files)
         
         for idx, file_path in enumerate(self.files):
-            # PDFを画像に変換
-            images = convert_from_path(file_path, dpi=dpi)
-            
             # ファイル名を生成
             base_name = Path(file_path).stem
+            page_sizes = self.page_render_sizes(file_path)
+            page_count = len(page_sizes)
+            
+            page_modes = None
+            if color_mode == 'rgb' and color_detection == 'auto':
+                page_modes = self.detect_page_modes(file_path, page_count)
+            
+            # メモリに収まるように描画の手順を決める
+            steps = governor.plan(page_sizes, dpi, page_modes)
+            reduced = [step for step in steps if step.dpi < dpi]
+            if reduced:
+                pages_text = "、".join(str(step.first + 1) for step in reduced)
+                self.notes.append(
+                    f"⚠️ {Path(file_path).name}: メモリ不足を避けるため {pages_text} ページ目を"
+                    f"{min(step.dpi for step in reduced)} dpiまで下げて描画しました")
             
-            for page_num, image in enumerate(images, start=1):
-                if len(images) > 1:
-                    output_file = f"{self.output_path}/{base_name}_page_{page_num}.{image_format.lower()}"
+            def report(page_num):
+                fraction = (idx + page_num / max(page_count, 1)) / total_files
+                self.report_progress(fraction, file_path, page_num)
+            
+            pages = self.iter_page_images(file_path, page_sizes, steps, postprocess)
+            
+            if output_format.multipage:
+                output_file = f"{self.output_path}/{base_name}.{output_format.extension}"
+                self.write_multipage(output_file, output_format, pages, report)
+                continue
+            
+            for page_num, image, output_dpi in pages:
+                if page_count > 1:
+                    output_file = f"{self.output_path}/{base_name}_page_{page_num}.{output_format.extension}"
                 else:
-                    output_file = f"{self.output_path}/{base_name}.{image_format.lower()}"
+                    output_file = f"{self.output_path}/{base_name}.{output_format.extension}"
                 
-                # 画像を保存
-                image.save(output_file, image_format)
+                with self.open_output(output_file) as output:
+                    image.save(output, output_format.save_format,
+                               dpi=(output_dpi, output_dpi), **output_format.save_options)
+                report(page_num)
+    
+    def detect_page_modes(self, file_path, page_count):
+        """ページごとの色を判定し、白黒のページはグレースケールで描画するよう色のリストを返す"""
+        try:
+            monochrome = detect_monochrome_pages(file_path, range(page_count))
+        except Exception as e:
+            # 判定できなければすべてカラーで描画する
+            self.notes.append(f"⚠️ {Path(file_path).name}: ページの色を判定できません: {str(e)}")
+            return None
+        if monochrome:
+            self.notes.append(
+                f"🎨 {Path(file_path).name}: {len(monochrome)}/{page_count} ページを白黒と判定し、"
+                f"グレースケールで描画しました")
+        return ['gray' if page in monochrome else 'rgb' for page in range(page_count)]
+    
+    def images_to_pdf(self):
+        """画像を1枚1ページのPDFにまとめる（1枚ずつ書き出すのでメモリ使用量は増えない）"""
+        default_dpi = self.kwargs.get('dpi', 200)
+        total_files = len(self.files)
+        
+        with self.open_output(self.output_path) as output:
+            pdf_writer = StreamingImagePDFWriter(output)
+            for idx, file_path in enumerate(self.files):
+                try:
+                    pages = 0
+                    for encoded in iter_encoded_images(file_path, default_dpi):
+                        pdf_writer.add_encoded_image(encoded)
+                        pages += 1
+                except Exception as e:
+                    raise Exception(f"ファイル '{Path(file_path).name}' の処理中にエラー: {str(e)}")
+                self.report_progress((idx + 1) / total_files, file_path, pages=pages)
+            pdf_writer.close()
+    
+    def page_render_sizes(self, file_path):
+        """pdftoppmで描画されるページの大きさ（ポイント、回転後）をページごとに取得"""
+        try:
+            sizes = []
+            for page in self._open_reader(file_path).pages:
+                box = page.mediabox
+                width, height = float(box.width), float(box.height)
+                if page.rotation % 180:
+                    width, height = height, width
+                sizes.append((width, height))
+            return sizes
+        except Exception:
+            # 暗号化などで読めない場合はpdfinfoの1ページ目の大きさを全ページに使う
+            info = pdf2image.pdfinfo_from_path(file_path)
+            width, _, height = info.get("Page size", "612 x 792").split()[:3]
+            return [(float(width), float(height))] * info["Pages"]
+    
+    def iter_page_images(self, file_path, page_sizes, steps, postprocess):
+        """描画の手順に従ってページを描画・後処理し、(ページ番号, 画像, 解像度) を順に返す"""
+        downsample = postprocess['downsample']
+        for step in steps:
+            # 縮小した分だけ解像度情報も下げる
+            output_dpi = step.dpi / downsample
+            grayscale = step.color_mode != 'rgb'
+            options = dict(postprocess, color_mode=step.color_mode)
+            if step.strip_rows:
+                image = self.render_page_strips(file_path, page_sizes[step.first], step,
+                                                grayscale, downsample)
+                yield step.first + 1, postprocess_page_image(
+                    image, **dict(options, downsample=1)), output_dpi
+                continue
             
-            progress = int((idx + 1) / total_files * 100)
-            self.progress.emit(progress)
+            # カラーが不要ならpdftoppmでグレースケール描画する
+            images = pdf2image.convert_from_path(file_path, dpi=step.dpi,
+                                                 first_page=step.first + 1, last_page=step.last,
+                                                 grayscale=grayscale)
+            for offset, image in enumerate(images):
+                yield step.first + offset + 1, postprocess_page_image(image, **options), output_dpi
+    
+    def render_page_strips(self, file_path, page_size, step, grayscale, downsample):
+        """大きなページを横長の帯ごとに描画・縮小して1枚に組み立てる"""
+        width, height = RenderMemoryGovernor.pixel_size(page_size, step.dpi)
+        channels = () if grayscale else (3,)
+        page = np.empty((height // downsample, width // downsample) + channels, dtype=np.uint8)
+        filled_rows = filled_cols = 0
+        
+        for top in range(0, height, step.strip_rows):
+            strip = render_page_region(file_path, step.first + 1, step.dpi, 0, top, width,
+                                       min(step.strip_rows, height - top), grayscale)
+            strip = strip.convert('L') if grayscale else strip.convert('RGB')
+            array = downsample_array(np.asarray(strip), downsample)
+            row = top // downsample
+            rows = min(array.shape[0], page.shape[0] - row)
+            cols = min(array.shape[1], page.shape[1])
+            page[row:row + rows, :cols] = array[:rows, :cols]
+            filled_rows, filled_cols = row + rows, max(filled_cols, cols)
+        
+        return Image.fromarray(np.ascontiguousarray(page[:filled_rows, :filled_cols]),
+                               'L' if grayscale else 'RGB')
+    
+    def write_multipage(self, output_file, output_format, pages, report):
+        """全ページを1つのファイルに1ページずつ追記していく"""
+        if output_format.save_format == 'PDF':
+            with self.open_output(output_file) as output:
+                pdf_writer = StreamingImagePDFWriter(output)
+                for page_num, image, output_dpi in pages:
+                    pdf_writer.add_image_page(image, output_dpi, **output_format.save_options)
+                    report(page_num)
+                pdf_writer.close()
+            return
+        
+        # AppendingTiffWriterは書き込んだIFDを読み返すため読み書き両用で開く
+        with self.open_output(output_file, 'w+b') as output, \
+                TiffImagePlugin.AppendingTiffWriter(output, True) as tiff:
+            for page_num, image, output_dpi in pages:
+                image.save(tiff, output_format.save_format, dpi=(output_dpi, output_dpi),
+                           **output_format.save_options)
+                tiff.newFrame()
+                report(page_num)
     
     def split_pdf(self):
-        """PDFを1ページずつ分割"""
+        """PDFを分割（max_bytesの指定がなければ1ページずつ）"""
+        if self.kwargs.get('max_bytes') is not None:
+            self.split_pdf_by_size()
+            return
+        
         file_path = self.files[0]
         
         with open(file_path, 'rb') as pdf_file:
             pdf_reader = PyPDF2.PdfReader(pdf_file)
             total_pages = len(pdf_reader.pages)
             
-            base_name = Path(file_path).stem
+            base_name = Path(file_path).stem
+            
+            for page_num in range(total_pages):
+                pdf_writer = PyPDF2.PdfWriter()
+                pdf_writer.add_page(prune_page_resources(pdf_reader.pages[page_num]))
+                
+                output_file = f"{self.output_path}/{base_name}_page_{page_num + 1}.pdf"
+                
+                with self.open_output(output_file) as output:
+                    pdf_writer.write(output)
+                
+                self.report_progress((page_num + 1) / total_pages, file_path, page_num + 1)
+    
+    def split_pdf_by_size(self):
+        """各ファイルが指定サイズ以下になるように、できるだけ少ない数に分割
+        
+        ページごとに参照するオブジェクトとそのサイズを見積もり、共有される
+        フォントや画像は同じファイル内で1回だけ数える。1ページだけで上限を
+        超える場合は、そのページを単独のファイルにする。
+        見積もりは書き出した結果と一致しないことがあるため、書き出したファイルが
+        上限を超えたら、収まらない後ろのページを次のファイルに回して書き直す。
+        """
+        file_path = self.files[0]
+        max_bytes = check_max_bytes(self.kwargs['max_bytes'])
+        pdf_reader = self._open_reader(file_path)
+        estimator = ObjectSizeEstimator(pdf_reader)
+        total_pages = len(pdf_reader.pages)
+        base_name = Path(file_path).stem
+        
+        # ページを先頭から順に詰めていく（見積もり誤差のため少し余裕を持たせる）
+        limit = max_bytes * 0.95
+        parts = []
+        current_pages = []
+        current_objects = set()
+        current_size = estimator.FILE_OVERHEAD
+        
+        for page_num, page in enumerate(pdf_reader.pages):
+            objects = estimator.page_objects(prune_page_resources(page))
+            added = sum(estimator.object_size(idnum) for idnum in objects - current_objects)
+            
+            if current_pages and current_size + added > limit:
+                parts.append(current_pages)
+                current_pages = []
+                current_objects = set()
+                current_size = estimator.FILE_OVERHEAD
+                added = sum(estimator.object_size(idnum) for idnum in objects)
+            
+            current_pages.append(page_num)
+            current_objects |= objects
+            current_size += added
+            
+            # ページ数は書き出すときに数える
+            self.report_progress((page_num + 1) / total_pages * 0.5, file_path, page_num + 1, pages=0)
+        
+        if current_pages:
+            parts.append(current_pages)
+        
+        index = 0
+        oversize_pages = []
+        while index < len(parts):
+            part_pages = parts[index]
+            pdf_writer = PyPDF2.PdfWriter()
+            for page_num in part_pages:
+                pdf_writer.add_page(pdf_reader.pages[page_num])
+            
+            output_file = f"{self.output_path}/{base_name}_part_{index + 1}.pdf"
+            
+            part_output = self.open_output(output_file)
+            with part_output as output:
+                pdf_writer.write(output)
+                size = output.tell()
+                if size > max_bytes and len(part_pages) > 1:
+                    part_output.discard()
             
-            for page_num in range(total_pages):
-                pdf_writer = PyPDF2.PdfWriter()
-                pdf_writer.add_page(pdf_reader.pages[page_num])
-                
-                output_file = f"{self.output_path}/{base_name}_page_{page_num + 1}.pdf"
-                
-                with open(output_file, 'wb') as output:
-                    pdf_writer.write(output)
-                
-                progress = int((page_num + 1) / total_pages * 100)
-                self.progress.emit(progress)
+            if part_output.discarded:
+                # 上限に収まる割合のページだけを残し、残りは次のファイルの先頭に回す
+                keep = max(1, min(len(part_pages) - 1, len(part_pages) * max_bytes // size))
+                parts[index] = part_pages[:keep]
+                if index + 1 < len(parts):
+                    parts[index + 1] = part_pages[keep:] + parts[index + 1]
+                else:
+                    parts.append(part_pages[keep:])
+                continue
+            
+            if size > max_bytes:
+                oversize_pages.append(part_pages[0] + 1)
+            self.report_progress(0.5 + (part_pages[-1] + 1) / total_pages * 0.5, file_path,
+                                 part_pages[-1] + 1, pages=len(part_pages))
+            index += 1
+        
+        if oversize_pages:
+            pages_text = "、".join(str(page_num) for page_num in oversize_pages)
+            self.notes.append(f"⚠️ {pages_text} ページ目は1ページで指定サイズを超えるため、単独のファイルにしました")
     
     def compress_pdf(self):
-        """PDFを圧縮"""
+        """PDFを圧縮（フォントの最適化も行う場合は、未使用フォントの削除・重複の統合・サブセット化）"""
         file_path = self.files[0]
+        optimize_fonts = self.kwargs.get('optimize_fonts', False)
         
         with open(file_path, 'rb') as pdf_file:
             pdf_reader = PyPDF2.PdfReader(pdf_file)
@@ -130,76 +2227,517 @@ class PDFProcessThread(QThread):
             total_pages = len(pdf_reader.pages)
             
             for page_num, page in enumerate(pdf_reader.pages):
-                page.compress_content_streams()
+                if optimize_fonts:
+                    # 使われていないフォントなどは書き出さない
+                    prune_page_resources(page)
                 pdf_writer.add_page(page)
                 
-                progress = int((page_num + 1) / total_pages * 100)
-                self.progress.emit(progress)
+                self.report_progress((page_num + 1) / total_pages * 0.5, file_path, page_num + 1)
             
-            with open(self.output_path, 'wb') as output_file:
+            if optimize_fonts:
+                self.optimize_fonts(pdf_writer)
+            self.report_progress(0.6, file_path, pages=0)
+            
+            # ページの内容などのストリームを並列に圧縮
+            recompress_streams(
+                pdf_writer, self.kwargs.get('compression_level', DEFAULT_FLATE_LEVEL),
+                self.kwargs.get('recompress_flate', False),
+                lambda done, total: self.report_progress(0.6 + 0.4 * done / total, file_path, pages=0))
+            self.report_progress(1.0, file_path, pages=0)
+            
+            with self.open_output(self.output_path) as output_file:
                 pdf_writer.write(output_file)
+        self.linearize_output()
+    
+    def optimize_fonts(self, pdf_writer):
+        """同じ内容のフォントプログラムをまとめてから、使われているグリフだけにサブセット化"""
+        share_duplicate_objects(pdf_writer)
+        count, saved = subset_embedded_fonts(pdf_writer, pdf_writer.pages)
+        if count:
+            self.notes.append(f"🔤 {count}個のフォントをサブセット化しました（{format_size(saved)}削減）")
     
     def rotate_pdf(self):
         """PDFを回転"""
         file_path = self.files[0]
-        pages_to_rotate = self.kwargs.get('pages_to_rotate', [])
+        pages_to_rotate = set(self.kwargs.get('pages_to_rotate', []))
         angle = self.kwargs.get('angle', 90)
         
-        with open(file_path, 'rb') as pdf_file:
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            pdf_writer = PyPDF2.PdfWriter()
-            
-            total_pages = len(pdf_reader.pages)
-            
-            for page_num, page in enumerate(pdf_reader.pages):
-                if page_num in pages_to_rotate:
-                    page.rotate(angle)
-                pdf_writer.add_page(page)
-                
-                progress = int((page_num + 1) / total_pages * 100)
-                self.progress.emit(progress)
-            
-            # パスワード設定
-            password = self.kwargs.get('password')
-            if password:
-                pdf_writer.encrypt(password)
-            
-            with open(self.output_path, 'wb') as output_file:
-                pdf_writer.write(output_file)
+        total_pages = len(self._open_reader(file_path).pages)
+        self.run_pipeline([
+            PageRef(file_path, page_num, angle if page_num in pages_to_rotate else 0)
+            for page_num in range(total_pages)
+        ])
     
     def extract_pages(self):
-        """特定のページを抽出"""
+        """特定のページを抽出（必要なら同時に回転）"""
         file_path = self.files[0]
         pages = self.kwargs.get('pages', [])
+        angle = self.kwargs.get('angle', 0)
         
-        with open(file_path, 'rb') as pdf_file:
+        total_pages = len(self._open_reader(file_path).pages)
+        self.run_pipeline([
+            PageRef(file_path, page_num, angle)
+            for page_num in pages if 0 <= page_num < total_pages
+        ], prune_resources=True)
+
+
+def decode_thumbnail(page):
+    """ページに埋め込まれたサムネイル画像（/Thumb）をデコード（なければNone）"""
+    thumb = page.get('/Thumb')
+    if thumb is None:
+        return None
+    
+    try:
+        thumb = thumb.get_object()
+        filters = thumb.get('/Filter', [])
+        if not isinstance(filters, generic.ArrayObject):
+            filters = [filters]
+        data = thumb.get_data()
+        
+        # JPEG・JPEG2000はget_dataでデコードされないのでそのまま開く
+        if filters and filters[-1] in ('/DCTDecode', '/JPXDecode'):
+            return Image.open(io.BytesIO(data))
+        
+        if thumb.get('/BitsPerComponent', 8) != 8:
+            return None
+        size = (int(thumb['/Width']), int(thumb['/Height']))
+        color_space = thumb.get('/ColorSpace', '/DeviceRGB')
+        if isinstance(color_space, generic.IndirectObject):
+            color_space = color_space.get_object()
+        
+        if color_space == '/DeviceGray':
+            return Image.frombytes('L', size, data)
+        if color_space == '/DeviceRGB':
+            return Image.frombytes('RGB', size, data)
+        if isinstance(color_space, generic.ArrayObject) and color_space[0] == '/Indexed':
+            # [/Indexed ベース 最大値 パレット]（ベースはRGBのみ対応）
+            if color_space[1].get_object() != '/DeviceRGB':
+                return None
+            lookup = color_space[3].get_object()
+            if isinstance(lookup, generic.StreamObject):
+                lookup = lookup.get_data()
+            else:
+                # 文字列はPDFDocEncodingで読めるとTextStringObjectになるため元のバイト列を使う
+                lookup = text_string_bytes(lookup)
+            image = Image.frombytes('P', size, data)
+            image.putpalette(lookup)
+            return image
+    except Exception:
+        # 壊れたサムネイルは使わずに描画する
+        return None
+    return None
+
+
+def page_ranges(pages, chunk_size):
+    """ページ番号のリストを連続した範囲（開始, 終了+1）に分ける"""
+    first = last = None
+    for page_num in pages:
+        if first is not None and page_num == last and last - first < chunk_size:
+            last += 1
+            continue
+        if first is not None:
+            yield first, last
+        first, last = page_num, page_num + 1
+    if first is not None:
+        yield first, last
+
+
+def parse_page_range(text, page_count):
+    """「1-10, 25」のような範囲指定を0始まりのページ番号のリストに変換"""
+    pages = set()
+    for part in text.replace('、', ',').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        first, separator, last = part.partition('-')
+        try:
+            first = int(first) if first.strip() else 1
+            last = int(last) if last.strip() else (page_count if separator else first)
+        except ValueError:
+            raise ValueError(f"ページ範囲の指定が正しくありません: {part}")
+        if first < 1 or last > page_count or first > last:
+            raise ValueError(f"ページ範囲は1〜{page_count}で指定してください: {part}")
+        pages.update(range(first - 1, last))
+    return sorted(pages)
+
+
+class PreviewRenderThread(QThread):
+    """プレビュー画像を低解像度→高解像度の順に段階的に描画
+    
+    最初の段階では、ページに埋め込まれたサムネイルがあればそれを使い、
+    ないページだけを低解像度で描画する。color_modeが'auto'なら最初の画像で
+    色のないページを判定し、以降の段階ではそのページをグレースケールで描画する。
+    """
+    page_rendered = Signal(int, QImage)
+    page_monochrome = Signal(int)  # 白黒と判定したページ番号
+    render_failed = Signal(str)
+    
+    CHUNK_SIZE = 10
+    
+    def __init__(self, pdf_path, pages, levels, thumbnail_size, color_mode='auto'):
+        super().__init__()
+        self.pdf_path = pdf_path
+        self.pages = pages
+        self.levels = levels
+        self.thumbnail_size = thumbnail_size
+        self.color_mode = color_mode  # 'auto' / 'color' / 'gray'
+        self.monochrome = set()
+    
+    def is_grayscale(self, page_num):
+        """ページをグレースケールで描画するか"""
+        return self.color_mode == 'gray' or page_num in self.monochrome
+    
+    def classify(self, page_num, image):
+        """最初に表示する画像からページが白黒かを判定"""
+        if self.color_mode == 'auto' and is_monochrome_image(image):
+            self.monochrome.add(page_num)
+            self.page_monochrome.emit(page_num)
+    
+    def emit_image(self, page_num, image):
+        if self.color_mode == 'gray':
+            image = image.convert('L')
+        qimage = pil_to_qimage(image).scaled(
+            self.thumbnail_size, Qt.AspectRatioMode.KeepAspectRatio,
+            Qt.TransformationMode.SmoothTransformation)
+        self.page_rendered.emit(page_num, qimage)
+    
+    def emit_embedded_thumbnails(self):
+        """埋め込みサムネイルを表示し、サムネイルのないページ番号のリストを返す"""
+        missing = []
+        with open(self.pdf_path, 'rb') as pdf_file:
             pdf_reader = PyPDF2.PdfReader(pdf_file)
-            pdf_writer = PyPDF2.PdfWriter()
+            for page_num in self.pages:
+                if self.isInterruptionRequested():
+                    break
+                image = decode_thumbnail(pdf_reader.pages[page_num])
+                if image is None:
+                    missing.append(page_num)
+                else:
+                    self.classify(page_num, image)
+                    self.emit_image(page_num, image)
+        return missing
+    
+    def run(self):
+        try:
+            missing = self.emit_embedded_thumbnails()
+            for level, dpi in enumerate(self.levels):
+                pages = missing if level == 0 else self.pages
+                # グレースケールで描画するページとカラーのページを分けて描画する
+                for grayscale, group in groupby(pages, key=self.is_grayscale):
+                    for first, last in page_ranges(list(group), self.CHUNK_SIZE):
+                        if self.isInterruptionRequested():
+                            return
+                        images = pdf2image.convert_from_path(self.pdf_path, dpi=dpi,
+                                                             first_page=first + 1, last_page=last,
+                                                             grayscale=grayscale)
+                        for offset, image in enumerate(images):
+                            if level == 0:
+                                self.classify(first + offset, image)
+                            self.emit_image(first + offset, image)
+        except Exception as e:
+            self.render_failed.emit(str(e))
+
+
+class TileRenderThread(QThread):
+    """拡大表示用のタイルを表示中の領域だけバックグラウンドで描画"""
+    tile_rendered = Signal(int, int, int, QImage)  # dpi, 列, 行, 画像
+    
+    def __init__(self, pdf_path, page_number, grayscale=False):
+        super().__init__()
+        self.pdf_path = pdf_path
+        self.page_number = page_number
+        self.grayscale = grayscale
+        self._requests = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+    
+    def request(self, dpi, col, row, region):
+        """タイルの描画を依頼（最後に依頼されたものから描画する）"""
+        key = (dpi, col, row)
+        with self._lock:
+            self._requests = [r for r in self._requests if r[0] != key]
+            self._requests.append((key, region))
+        self._wake.set()
+    
+    def discard_requests(self, keep_dpi):
+        """表示していない拡大率の依頼を取り消す"""
+        with self._lock:
+            self._requests = [r for r in self._requests if r[0][0] == keep_dpi]
+    
+    def stop(self):
+        self.requestInterruption()
+        self._wake.set()
+        self.wait()
+    
+    def run(self):
+        while not self.isInterruptionRequested():
+            with self._lock:
+                request = self._requests.pop() if self._requests else None
+                if request is None:
+                    self._wake.clear()
+            if request is None:
+                self._wake.wait()
+                continue
             
-            for idx, page_num in enumerate(pages):
-                if 0 <= page_num < len(pdf_reader.pages):
-                    pdf_writer.add_page(pdf_reader.pages[page_num])
+            (dpi, col, row), (x, y, width, height) = request
+            try:
+                image = render_page_region(self.pdf_path, self.page_number, dpi, x, y, width, height,
+                                           self.grayscale)
+            except Exception:
+                continue
+            self.tile_rendered.emit(dpi, col, row, pil_to_qimage(image))
+
+
+class TiledPageView(QWidget):
+    """ページをタイル単位で描画する拡大表示ビュー"""
+    TILE_SIZE = 512
+    CACHE_LIMIT = 96
+    
+    def __init__(self, pdf_path, page_number, page_size, base_image, grayscale=False, parent=None):
+        super().__init__(parent)
+        self.page_size = page_size  # ポイント単位（幅, 高さ）
+        self.base_image = base_image
+        self.dpi = 96
+        self.tiles = OrderedDict()
+        
+        self.renderer = TileRenderThread(pdf_path, page_number, grayscale)
+        self.renderer.tile_rendered.connect(self.on_tile_rendered)
+        self.renderer.start()
+        self.set_dpi(self.dpi)
+    
+    def pixel_size(self):
+        width, height = self.page_size
+        return int(width * self.dpi / 72), int(height * self.dpi / 72)
+    
+    def set_dpi(self, dpi):
+        """拡大率（dpi）を変更"""
+        self.dpi = dpi
+        self.renderer.discard_requests(dpi)
+        self.setFixedSize(*self.pixel_size())
+        self.update()
+    
+    def on_tile_rendered(self, dpi, col, row, image):
+        """タイルの描画完了時の処理"""
+        self.tiles[(dpi, col, row)] = image
+        while len(self.tiles) > self.CACHE_LIMIT:
+            self.tiles.popitem(last=False)
+        if dpi == self.dpi:
+            self.update(QRect(col * self.TILE_SIZE, row * self.TILE_SIZE,
+                              self.TILE_SIZE, self.TILE_SIZE))
+    
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(event.rect(), Qt.GlobalColor.white)
+        
+        tile = self.TILE_SIZE
+        width, height = self.pixel_size()
+        visible = event.rect().intersected(QRect(0, 0, width, height))
+        if visible.isEmpty():
+            return
+        
+        scale_x = self.base_image.width() / width
+        scale_y = self.base_image.height() / height
+        
+        for row in range(visible.top() // tile, visible.bottom() // tile + 1):
+            for col in range(visible.left() // tile, visible.right() // tile + 1):
+                tile_rect = QRect(col * tile, row * tile,
+                                  min(tile, width - col * tile), min(tile, height - row * tile))
+                key = (self.dpi, col, row)
+                image = self.tiles.get(key)
+                if image is not None:
+                    self.tiles.move_to_end(key)
+                    painter.drawImage(tile_rect.topLeft(), image)
+                    continue
                 
-                progress = int((idx + 1) / len(pages) * 100)
-                self.progress.emit(progress)
-            
-            # パスワード設定
-            password = self.kwargs.get('password')
-            if password:
-                pdf_writer.encrypt(password)
-            
-            with open(self.output_path, 'wb') as output_file:
-                pdf_writer.write(output_file)
+                # 高解像度のタイルができるまでは低解像度の画像を拡大して表示
+                source = QRectF(tile_rect.x() * scale_x, tile_rect.y() * scale_y,
+                                tile_rect.width() * scale_x, tile_rect.height() * scale_y)
+                painter.drawImage(QRectF(tile_rect), self.base_image, source)
+                self.renderer.request(self.dpi, col, row,
+                                      (tile_rect.x(), tile_rect.y(), tile_rect.width(), tile_rect.height()))
+    
+    def stop(self):
+        self.renderer.stop()
+
+
+class PageZoomDialog(QDialog):
+    """ページを拡大表示するダイアログ"""
+    ZOOM_LEVELS = [50, 75, 100, 150, 200, 300, 400]
+    
+    def __init__(self, pdf_path, page_index, page_size, base_image, grayscale=False, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"ページ {page_index + 1} - {Path(pdf_path).name}")
+        self.setGeometry(150, 100, 900, 800)
+        self.zoom_index = self.ZOOM_LEVELS.index(100)
+        
+        layout = QVBoxLayout(self)
+        
+        # 拡大・縮小ボタン
+        zoom_layout = QHBoxLayout()
+        zoom_out_button = QPushButton("➖ 縮小")
+        zoom_out_button.clicked.connect(lambda: self.change_zoom(-1))
+        zoom_layout.addWidget(zoom_out_button)
+        
+        self.zoom_label = QLabel()
+        self.zoom_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.zoom_label.setMinimumWidth(60)
+        zoom_layout.addWidget(self.zoom_label)
+        
+        zoom_in_button = QPushButton("➕ 拡大")
+        zoom_in_button.clicked.connect(lambda: self.change_zoom(1))
+        zoom_layout.addWidget(zoom_in_button)
+        zoom_layout.addStretch()
+        layout.addLayout(zoom_layout)
+        
+        # タイル表示ビュー
+        self.page_view = TiledPageView(pdf_path, page_index + 1, page_size, base_image, grayscale)
+        scroll = QScrollArea()
+        scroll.setWidget(self.page_view)
+        scroll.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(scroll)
+        
+        self.change_zoom(0)
+    
+    def change_zoom(self, step):
+        """拡大率を変更（画面の96dpiを100%とする）"""
+        self.zoom_index = max(0, min(len(self.ZOOM_LEVELS) - 1, self.zoom_index + step))
+        zoom = self.ZOOM_LEVELS[self.zoom_index]
+        self.zoom_label.setText(f"{zoom}%")
+        self.page_view.set_dpi(96 * zoom // 100)
+    
+    def done(self, result):
+        self.page_view.stop()
+        super().done(result)
+
+
+class PageThumbnailModel(QAbstractListModel):
+    """プレビューに並べるページ番号と描画済みの画像を保持するリストモデル"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._pages = []
+        self._rows = {}
+        self._images = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._pages)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        page_num = self._pages[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return f"ページ {page_num + 1}"
+        if role == Qt.ItemDataRole.DecorationRole:
+            return self._images.get(page_num)
+        if role == Qt.ItemDataRole.UserRole:
+            return page_num
+        return None
+
+    def set_pages(self, pages):
+        """表示するページを置き換える（描画済みの画像は破棄）"""
+        self.beginResetModel()
+        self._pages = list(pages)
+        self._rows = {page_num: row for row, page_num in enumerate(self._pages)}
+        self._images = {}
+        self.endResetModel()
+
+    def pages(self):
+        """表示中のページ番号のリストを取得"""
+        return list(self._pages)
+
+    def row_of(self, page_num):
+        """ページ番号の行を取得（表示していないページはNone）"""
+        return self._rows.get(page_num)
+
+    def image(self, page_num):
+        """描画済みのページ画像を取得"""
+        return self._images.get(page_num)
+
+    def set_image(self, page_num, image):
+        """ページ画像を設定（表示していないページは無視）"""
+        row = self._rows.get(page_num)
+        if row is None:
+            return
+        self._images[page_num] = image
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.DecorationRole])
+
+
+class PageThumbnailDelegate(QStyledItemDelegate):
+    """ページの見出し・選択状態・サムネイルを描画するデリゲート（ページごとのウィジェットは作らない）"""
+    MARGIN = 5
+    PADDING = 5
+    HEADER_HEIGHT = 24
+    
+    def __init__(self, thumbnail_size, parent=None):
+        super().__init__(parent)
+        self.thumbnail_size = thumbnail_size
+        self.selected_pen = QPen(QColor("#3498db"), 3)
+        self.selected_brush = QColor("#e3f2fd")
+        self.normal_pen = QPen(QColor("#bdc3c7"), 2)
+        self.normal_brush = QColor("white")
+    
+    def sizeHint(self, option, index):
+        inset = 2 * (self.MARGIN + self.PADDING)
+        return QSize(self.thumbnail_size.width() + inset,
+                     self.thumbnail_size.height() + inset + self.HEADER_HEIGHT)
+    
+    def paint(self, painter, option, index):
+        painter.save()
+        selected = bool(option.state & QStyle.StateFlag.State_Selected)
+        rect = option.rect.adjusted(self.MARGIN, self.MARGIN, -self.MARGIN, -self.MARGIN)
+        
+        # 見出し（選択状態とページ番号）
+        header = QRect(rect.left(), rect.top(), rect.width(), self.HEADER_HEIGHT)
+        font = QFont(option.font)
+        font.setBold(True)
+        font.setPixelSize(13)
+        painter.setFont(font)
+        painter.setPen(option.palette.color(QPalette.ColorRole.Text))
+        painter.drawText(header, Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter,
+                         f"{'☑' if selected else '☐'} {index.data()}")
+        
+        # 枠（選択中は青）
+        frame = QRectF(rect.adjusted(0, self.HEADER_HEIGHT, 0, 0)).adjusted(1.5, 1.5, -1.5, -1.5)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(self.selected_pen if selected else self.normal_pen)
+        painter.setBrush(self.selected_brush if selected else self.normal_brush)
+        painter.drawRoundedRect(frame, 5, 5)
+        
+        # サムネイル（描画が終わるまでは仮の表示）
+        image = index.data(Qt.ItemDataRole.DecorationRole)
+        if image is None:
+            painter.setPen(option.palette.color(QPalette.ColorRole.Text))
+            painter.drawText(frame, Qt.AlignmentFlag.AlignCenter, "⏳")
+        else:
+            center = frame.center()
+            painter.drawImage(QPointF(center.x() - image.width() / 2, center.y() - image.height() / 2), image)
+        painter.restore()
 
 
 class PDFPreviewWidget(QWidget):
     """PDFプレビューウィジェット"""
+    # 最初に低解像度で全ページを表示し、その後で高解像度に置き換える
+    PREVIEW_DPI_LEVELS = (24, 100)
+    THUMBNAIL_SIZE = QSize(250, 350)
+    # 一度に表示（描画）するページ数。これより後ろのページは移動したときに描画する
+    WINDOW_PAGES = 30
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         self.pdf_path = None
-        self.pages = []
-        self.page_labels = []
+        self.page_count = 0
+        self.page_sizes = []
+        self.page_filter = []  # 表示対象のページ番号（範囲指定で絞り込む）
+        self.window_start = 0  # page_filterのうち表示中の先頭の位置
         self.selected_pages = set()
+        self.monochrome_pages = set()  # 描画時に白黒と判定したページ
+        self.render_thread = None
+        self.index_thread = None
+        self.doc_hash = None
+        self._syncing_selection = False
         self.init_ui()
     
     def init_ui(self):
@@ -220,19 +2758,80 @@ class PDFPreviewWidget(QWidget):
         self.info_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         layout.addWidget(self.info_label)
         
-        # スクロールエリア
-        scroll = QScrollArea()
-        scroll.setWidgetResizable(True)
-        scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
-        scroll.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
-        
-        # グリッドウィジェット
-        self.grid_widget = QWidget()
-        self.grid_layout = QGridLayout(self.grid_widget)
-        self.grid_layout.setSpacing(10)
-        
-        scroll.setWidget(self.grid_widget)
-        layout.addWidget(scroll)
+        # テキスト検索でページを選択
+        search_layout = QHBoxLayout()
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("ページ内のテキストで検索（空白区切りですべてを含むページ）")
+        self.search_edit.returnPressed.connect(self.select_matching_pages)
+        search_layout.addWidget(self.search_edit)
+        
+        search_button = QPushButton("🔎 一致するページを選択")
+        search_button.clicked.connect(self.select_matching_pages)
+        search_layout.addWidget(search_button)
+        
+        self.search_status_label = QLabel()
+        search_layout.addWidget(self.search_status_label)
+        layout.addLayout(search_layout)
+        
+        # 表示するページの範囲・移動
+        nav_layout = QHBoxLayout()
+        nav_layout.addWidget(QLabel("表示範囲:"))
+        self.range_edit = QLineEdit()
+        self.range_edit.setPlaceholderText("例: 1-10, 2400-2450（空欄ですべて）")
+        self.range_edit.returnPressed.connect(self.apply_page_filter)
+        nav_layout.addWidget(self.range_edit)
+        
+        range_button = QPushButton("絞り込み")
+        range_button.clicked.connect(self.apply_page_filter)
+        nav_layout.addWidget(range_button)
+        
+        self.prev_button = QPushButton("◀ 前へ")
+        self.prev_button.clicked.connect(lambda: self.show_window(self.window_start - self.WINDOW_PAGES))
+        nav_layout.addWidget(self.prev_button)
+        
+        self.page_spinbox = QSpinBox()
+        self.page_spinbox.setRange(1, 1)
+        self.page_spinbox.setPrefix("ページ ")
+        nav_layout.addWidget(self.page_spinbox)
+        
+        go_button = QPushButton("移動")
+        go_button.clicked.connect(lambda: self.go_to_page(self.page_spinbox.value() - 1))
+        nav_layout.addWidget(go_button)
+        
+        self.next_button = QPushButton("次へ ▶")
+        self.next_button.clicked.connect(lambda: self.show_window(self.window_start + self.WINDOW_PAGES))
+        nav_layout.addWidget(self.next_button)
+        
+        self.window_label = QLabel()
+        nav_layout.addWidget(self.window_label)
+        
+        nav_layout.addWidget(QLabel("表示色:"))
+        self.color_combo = QComboBox()
+        self.color_combo.addItem("自動判定", "auto")
+        self.color_combo.addItem("カラー", "color")
+        self.color_combo.addItem("グレースケール", "gray")
+        self.color_combo.setToolTip("自動判定では、色のないページをグレースケールで描画します")
+        self.color_combo.currentIndexChanged.connect(lambda: self.show_window(self.window_start))
+        nav_layout.addWidget(self.color_combo)
+        layout.addLayout(nav_layout)
+        
+        # ページ一覧（クリックで選択、ダブルクリックで拡大表示）
+        self.page_model = PageThumbnailModel(self)
+        self.page_view = QListView()
+        self.page_view.setViewMode(QListView.ViewMode.IconMode)
+        self.page_view.setResizeMode(QListView.ResizeMode.Adjust)
+        self.page_view.setMovement(QListView.Movement.Static)
+        self.page_view.setUniformItemSizes(True)
+        self.page_view.setSpacing(5)
+        self.page_view.setSelectionMode(QAbstractItemView.SelectionMode.MultiSelection)
+        self.page_view.setItemDelegate(PageThumbnailDelegate(self.THUMBNAIL_SIZE, self.page_view))
+        self.page_view.setModel(self.page_model)
+        self.page_view.setToolTip("クリックで選択、ダブルクリックで拡大表示")
+        self.page_view.selectionModel().selectionChanged.connect(self.on_selection_changed)
+        self.page_view.doubleClicked.connect(
+            lambda index: self.show_zoom(index.data(Qt.ItemDataRole.UserRole)))
+        layout.addWidget(self.page_view)
+        self.update_navigation()
     
     def load_pdf(self, file_path=None):
         """PDFを読み込んでプレビュー表示"""
@@ -264,58 +2863,32 @@ class PDFPreviewWidget(QWidget):
             """)
             QApplication.processEvents()  # UIを更新
             
-            # PDFを画像に変換（低解像度でプレビュー）
-            images = convert_from_path(file_path, dpi=100)
-            self.pages = images
+            # ページ数とページサイズを取得（画像はバックグラウンドで描画）
+            with open(file_path, 'rb') as pdf_file:
+                pdf_reader = PyPDF2.PdfReader(pdf_file)
+                for page in pdf_reader.pages:
+                    width, height = float(page.mediabox.width), float(page.mediabox.height)
+                    if page.get('/Rotate', 0) % 180 == 90:
+                        width, height = height, width
+                    self.page_sizes.append((width, height))
+            self.page_count = len(self.page_sizes)
             
-            # グリッドに配置（1行に3列）
-            for idx, image in enumerate(images):
-                # PIL ImageをQPixmapに変換
-                img_byte_arr = io.BytesIO()
-                image.save(img_byte_arr, format='PNG')
-                img_byte_arr.seek(0)
-                
-                qimage = QImage.fromData(img_byte_arr.read())
-                pixmap = QPixmap.fromImage(qimage)
-                
-                # サムネイルサイズに縮小
-                pixmap = pixmap.scaled(250, 350, Qt.AspectRatioMode.KeepAspectRatio, 
-                                      Qt.TransformationMode.SmoothTransformation)
-                
-                # ページウィジェット作成
-                page_widget = QWidget()
-                page_layout = QVBoxLayout(page_widget)
-                page_layout.setContentsMargins(5, 5, 5, 5)
-                
-                # チェックボックス
-                checkbox = QCheckBox(f"ページ {idx + 1}")
-                checkbox.setStyleSheet("font-weight: bold; font-size: 13px;")
-                checkbox.stateChanged.connect(lambda state, p=idx: self.on_page_selected(p, state))
-                page_layout.addWidget(checkbox)
-                
-                # 画像ラベル
-                label = QLabel()
-                label.setPixmap(pixmap)
-                label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-                label.setStyleSheet("""
-                    QLabel {
-                        border: 2px solid #bdc3c7;
-                        border-radius: 5px;
-                        padding: 5px;
-                        background-color: white;
-                    }
-                """)
-                page_layout.addWidget(label)
-                
-                # グリッドに追加（3列）
-                row = idx // 3
-                col = idx % 3
-                self.grid_layout.addWidget(page_widget, row, col)
-                
-                self.page_labels.append({'checkbox': checkbox, 'label': label, 'widget': page_widget})
+            self.page_filter = list(range(self.page_count))
+            self.page_spinbox.setRange(1, max(1, self.page_count))
+            self.show_window(0)
+            
+            # テキスト検索用のインデックスを作成（作成済みのファイルはすぐ終わる）
+            self.search_status_label.setText("⏳ 索引作成中")
+            self.index_thread = TextIndexThread(file_path, self.page_count)
+            self.index_thread.progress.connect(
+                lambda value: self.search_status_label.setText(f"⏳ 索引作成中 {value}%"))
+            self.index_thread.index_ready.connect(self.on_index_ready)
+            self.index_thread.index_failed.connect(
+                lambda message: self.search_status_label.setText(f"❌ 索引を作成できません: {message}"))
+            self.index_thread.start()
             
             # 情報ラベルを更新
-            self.info_label.setText(f"✅ 読み込み完了: {Path(file_path).name} ({len(images)}ページ)")
+            self.info_label.setText(f"✅ 読み込み完了: {Path(file_path).name} ({self.page_count}ページ)")
             self.info_label.setStyleSheet("""
                 QLabel {
                     background-color: #d4edda;
@@ -328,64 +2901,192 @@ class PDFPreviewWidget(QWidget):
             
             return True
         except Exception as e:
-            self.info_label.setText(f"❌ エラー: {str(e)}")
-            self.info_label.setStyleSheet("""
-                QLabel {
-                    background-color: #f8d7da;
-                    color: #721c24;
-                    padding: 10px;
-                    border-radius: 5px;
-                    border: 1px solid #f5c6cb;
-                }
-            """)
-            QMessageBox.critical(self, "エラー", f"PDFの読み込みに失敗しました: {str(e)}")
+            self.show_error(str(e))
             return False
     
+    def show_window(self, start):
+        """page_filterのstart番目から最大WINDOW_PAGESページを表示し、そのページだけを描画"""
+        if not self.pdf_path:
+            return
+        start = max(0, min(start, max(0, len(self.page_filter) - 1)))
+        self.stop_page_rendering()
+        self.window_start = start
+        
+        window = self.page_filter[start:start + self.WINDOW_PAGES]
+        self._syncing_selection = True
+        self.page_model.set_pages(window)
+        self._syncing_selection = False
+        # 別の範囲を表示していた間の選択状態を反映
+        self.sync_selection()
+        self.page_view.scrollToTop()
+        self.update_navigation()
+        
+        # 表示中のページだけ画像の描画を開始
+        if window:
+            self.render_thread = PreviewRenderThread(
+                self.pdf_path, window, self.PREVIEW_DPI_LEVELS, self.THUMBNAIL_SIZE,
+                self.color_combo.currentData())
+            self.render_thread.page_rendered.connect(self.on_page_rendered)
+            self.render_thread.page_monochrome.connect(self.monochrome_pages.add)
+            self.render_thread.render_failed.connect(self.on_render_failed)
+            self.render_thread.start()
+    
+    def go_to_page(self, page_num):
+        """指定したページを先頭にして表示（絞り込みの範囲外なら絞り込みを解除）"""
+        if not 0 <= page_num < self.page_count:
+            return
+        if page_num not in self.page_filter:
+            self.range_edit.clear()
+            self.page_filter = list(range(self.page_count))
+        # 末尾付近のページでも1画面分のページが並ぶようにする
+        position = self.page_filter.index(page_num)
+        self.show_window(min(position, max(0, len(self.page_filter) - self.WINDOW_PAGES)))
+    
+    def apply_page_filter(self):
+        """表示範囲の指定に一致するページだけを表示"""
+        if not self.pdf_path:
+            return
+        text = self.range_edit.text().strip()
+        try:
+            pages = parse_page_range(text, self.page_count) if text else list(range(self.page_count))
+        except ValueError as e:
+            QMessageBox.warning(self, "警告", str(e))
+            return
+        self.page_filter = pages
+        self.show_window(0)
+    
+    def update_navigation(self):
+        """前へ・次へボタンと表示中の範囲の表示を更新"""
+        window = self.page_filter[self.window_start:self.window_start + self.WINDOW_PAGES]
+        self.prev_button.setEnabled(self.window_start > 0)
+        self.next_button.setEnabled(self.window_start + self.WINDOW_PAGES < len(self.page_filter))
+        if window:
+            self.window_label.setText(
+                f"{window[0] + 1}〜{window[-1] + 1}ページのうち{len(window)}ページを表示"
+                f"（対象 {len(self.page_filter)} / {self.page_count}ページ）")
+            self.page_spinbox.setValue(window[0] + 1)
+        else:
+            self.window_label.setText("")
+    
+    def show_error(self, message):
+        """エラーを表示"""
+        self.info_label.setText(f"❌ エラー: {message}")
+        self.info_label.setStyleSheet("""
+            QLabel {
+                background-color: #f8d7da;
+                color: #721c24;
+                padding: 10px;
+                border-radius: 5px;
+                border: 1px solid #f5c6cb;
+            }
+        """)
+        QMessageBox.critical(self, "エラー", f"PDFの読み込みに失敗しました: {message}")
+    
+    def on_page_rendered(self, page_num, qimage):
+        """ページ画像の描画完了時の処理（より高解像度の画像で置き換える）"""
+        self.page_model.set_image(page_num, qimage)
+    
+    def on_render_failed(self, message):
+        """ページ画像の描画に失敗した時の処理"""
+        self.show_error(message)
+    
+    def on_index_ready(self, doc_hash):
+        """テキストのインデックス作成完了時の処理"""
+        self.doc_hash = doc_hash
+        self.search_status_label.setText("✅ 検索できます")
+    
+    def select_matching_pages(self):
+        """検索語を含むページを選択"""
+        query = self.search_edit.text().strip()
+        if not query or not self.page_count:
+            return
+        if self.doc_hash is None:
+            QMessageBox.information(self, "情報", "テキストの索引を作成中です。しばらくお待ちください。")
+            return
+        
+        index = PageTextIndex()
+        try:
+            matches = index.search(self.doc_hash, query)
+        finally:
+            index.close()
+        
+        self.set_selected_pages(matches)
+        self.search_status_label.setText(f"🔎 {len(matches)}ページが一致")
+    
+    def show_zoom(self, page_num):
+        """ページを拡大表示"""
+        base_image = self.page_model.image(page_num)
+        if base_image is None:
+            base_image = QImage(self.THUMBNAIL_SIZE, QImage.Format.Format_RGB888)
+            base_image.fill(Qt.GlobalColor.white)
+        color_mode = self.color_combo.currentData()
+        grayscale = color_mode == 'gray' or (color_mode == 'auto' and page_num in self.monochrome_pages)
+        dialog = PageZoomDialog(self.pdf_path, page_num, self.page_sizes[page_num], base_image,
+                                grayscale, self)
+        dialog.exec()
+    
+    def stop_page_rendering(self):
+        """ページ画像を描画中のスレッドを停止"""
+        if self.render_thread is not None:
+            self.render_thread.requestInterruption()
+            self.render_thread.wait()
+            self.render_thread = None
+    
+    def stop_rendering(self):
+        """描画中・索引作成中のスレッドを停止"""
+        self.stop_page_rendering()
+        if self.index_thread is not None:
+            self.index_thread.requestInterruption()
+            self.index_thread.wait()
+            self.index_thread = None
+        self.doc_hash = None
+    
     def clear_preview(self):
         """プレビューをクリア"""
+        self.stop_rendering()
         self.selected_pages.clear()
-        self.page_labels.clear()
-        
-        # 既存のウィジェットを削除
-        for i in reversed(range(self.grid_layout.count())): 
-            widget = self.grid_layout.itemAt(i).widget()
-            if widget:
-                widget.setParent(None)
-    
-    def on_page_selected(self, page_num, state):
-        """ページが選択された時の処理"""
-        if state == Qt.CheckState.Checked.value:
-            self.selected_pages.add(page_num)
-            # ボーダーを青に
-            self.page_labels[page_num]['label'].setStyleSheet("""
-                QLabel {
-                    border: 3px solid #3498db;
-                    border-radius: 5px;
-                    padding: 5px;
-                    background-color: #e3f2fd;
-                }
-            """)
-        else:
-            self.selected_pages.discard(page_num)
-            # ボーダーを元に戻す
-            self.page_labels[page_num]['label'].setStyleSheet("""
-                QLabel {
-                    border: 2px solid #bdc3c7;
-                    border-radius: 5px;
-                    padding: 5px;
-                    background-color: white;
-                }
-            """)
+        self.monochrome_pages.clear()
+        self.page_sizes = []
+        self.page_count = 0
+        self.page_filter = []
+        self.window_start = 0
+        self.range_edit.clear()
+        self.page_model.set_pages([])
+        self.update_navigation()
+    
+    def on_selection_changed(self, selected, deselected):
+        """ページの選択が変わった時の処理（表示中の範囲の変化だけを反映）"""
+        if self._syncing_selection:
+            return
+        for index in selected.indexes():
+            self.selected_pages.add(index.data(Qt.ItemDataRole.UserRole))
+        for index in deselected.indexes():
+            self.selected_pages.discard(index.data(Qt.ItemDataRole.UserRole))
+    
+    def sync_selection(self):
+        """selected_pagesを表示中のページの選択状態に反映"""
+        rows = [row for row, page_num in enumerate(self.page_model.pages())
+                if page_num in self.selected_pages]
+        selection = QItemSelection()
+        for first, last in page_ranges(rows, len(rows)):
+            selection.select(self.page_model.index(first), self.page_model.index(last - 1))
+        self._syncing_selection = True
+        self.page_view.selectionModel().select(
+            selection, QItemSelectionModel.SelectionFlag.ClearAndSelect)
+        self._syncing_selection = False
+    
+    def set_selected_pages(self, pages):
+        """選択するページを置き換える（表示していないページも含む）"""
+        self.selected_pages = set(pages)
+        self.sync_selection()
     
     def select_all(self):
-        """すべてのページを選択"""
-        for item in self.page_labels:
-            item['checkbox'].setChecked(True)
+        """すべてのページを選択（表示範囲を絞り込んでいる場合はその範囲のページ）"""
+        self.set_selected_pages(self.page_filter)
     
     def deselect_all(self):
         """すべての選択を解除"""
-        for item in self.page_labels:
-            item['checkbox'].setChecked(False)
+        self.set_selected_pages([])
     
     def get_selected_pages(self):
         """選択されたページのリストを取得"""
@@ -397,7 +3098,7 @@ class PDFPreviewWidget(QWidget):
     
     def get_total_pages(self):
         """総ページ数を取得"""
-        return len(self.pages)
+        return self.page_count
 
 
 class PDFInfoDialog(QDialog):
@@ -406,10 +3107,11 @@ class PDFInfoDialog(QDialog):
         super().__init__(parent)
         self.setWindowTitle("PDF情報")
         self.setGeometry(200, 200, 500, 400)
+        self.file_path = file_path
         
         layout = QVBoxLayout(self)
         
-        info_text = QTextEdit()
+        info_text = self.info_text = QTextEdit()
         info_text.setReadOnly(True)
         
         try:
@@ -433,9 +3135,28 @@ class PDFInfoDialog(QDialog):
         
         layout.addWidget(info_text)
         
+        self.analyze_button = QPushButton("📊 サイズの内訳を分析")
+        self.analyze_button.setToolTip("画像・フォント・ページの内容などの種類ごとのサイズと、大きいオブジェクトを表示")
+        self.analyze_button.clicked.connect(self.analyze_size)
+        layout.addWidget(self.analyze_button)
+        
         button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok)
         button_box.accepted.connect(self.accept)
         layout.addWidget(button_box)
+    
+    def analyze_size(self):
+        """サイズの内訳を求めて情報の後ろに表示"""
+        self.analyze_button.setEnabled(False)
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            with open(self.file_path, 'rb') as pdf_file:
+                report = format_size_analysis(analyze_pdf_size(PyPDF2.PdfReader(pdf_file)))
+        except Exception as e:
+            report = f"サイズを分析できません: {str(e)}"
+            self.analyze_button.setEnabled(True)
+        finally:
+            QApplication.restoreOverrideCursor()
+        self.info_text.append("\n--- サイズの内訳 ---\n" + report)
 
 
 class PasswordDialog(QDialog):
@@ -471,33 +3192,374 @@ class PasswordDialog(QDialog):
         else:
             QMessageBox.warning(self, "エラー", "パスワードを入力してください")
     
-    def get_password(self):
-        return self.password_input.text()
-
-
-class DragDropListWidget(QListWidget):
-    """ドラッグ&ドロップ対応のリストウィジェット"""
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.setAcceptDrops(True)
-        self.parent_widget = parent
+    def get_password(self):
+        return self.password_input.text()
+
+
+class PDFFileListModel(QAbstractListModel):
+    """ファイルパスを保持するリストモデル（重複判定はハッシュセットで行う）"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._files = []
+        self._index = set()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._files)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        file_path = self._files[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return os.path.basename(file_path)
+        if role in (Qt.ItemDataRole.UserRole, Qt.ItemDataRole.ToolTipRole):
+            return file_path
+        return None
+
+    def files(self):
+        """ファイルパスのリストを取得"""
+        return list(self._files)
+
+    def file_at(self, row):
+        """指定行のファイルパスを取得"""
+        return self._files[row]
+
+    def add_files(self, files):
+        """ファイルをまとめて追加（追加した件数を返す）"""
+        new_files = []
+        for file in files:
+            if file not in self._index:
+                self._index.add(file)
+                new_files.append(file)
+
+        if new_files:
+            first = len(self._files)
+            self.beginInsertRows(QModelIndex(), first, first + len(new_files) - 1)
+            self._files.extend(new_files)
+            self.endInsertRows()
+        return len(new_files)
+
+    def set_file(self, file):
+        """リストを1ファイルだけにする"""
+        self.clear()
+        self.add_files([file])
+
+    def remove_rows(self, rows):
+        """指定行をまとめて削除"""
+        # 後ろから連続した範囲ごとに削除する
+        rows = sorted(set(rows), reverse=True)
+        while rows:
+            last = first = rows.pop(0)
+            while rows and rows[0] == first - 1:
+                first = rows.pop(0)
+            self.beginRemoveRows(QModelIndex(), first, last)
+            for file in self._files[first:last + 1]:
+                self._index.discard(file)
+            del self._files[first:last + 1]
+            self.endRemoveRows()
+
+    def move_row(self, row, offset):
+        """行を上下に移動（offsetは-1または1）"""
+        target = row + offset
+        if not (0 <= row < len(self._files) and 0 <= target < len(self._files)):
+            return False
+        # beginMoveRowsの移動先は「挿入位置」で指定する
+        destination = target + 1 if offset > 0 else target
+        self.beginMoveRows(QModelIndex(), row, row, QModelIndex(), destination)
+        self._files[row], self._files[target] = self._files[target], self._files[row]
+        self.endMoveRows()
+        return True
+
+    def clear(self):
+        """すべてのファイルをクリア"""
+        self.beginResetModel()
+        self._files.clear()
+        self._index.clear()
+        self.endResetModel()
+
+
+class FolderScanThread(QThread):
+    """フォルダ内のファイルを別スレッドで再帰的に検索"""
+    files_found = Signal(list)
+    scan_finished = Signal(int)
+
+    BATCH_SIZE = 500
+
+    def __init__(self, folders, extensions=('.pdf',)):
+        super().__init__()
+        self.folders = folders
+        self.extensions = tuple(extensions)
+
+    def run(self):
+        batch = []
+        total = 0
+        stack = list(reversed(self.folders))
+
+        # ウィンドウを閉じる時などに中断できるよう、フォルダごとに確認する
+        while stack and not self.isInterruptionRequested():
+            folder = stack.pop()
+            try:
+                with os.scandir(folder) as it:
+                    entries = sorted(it, key=lambda e: e.name.lower())
+            except OSError:
+                continue
+
+            sub_folders = []
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        sub_folders.append(entry.path)
+                    elif entry.name.lower().endswith(self.extensions):
+                        batch.append(entry.path)
+                except OSError:
+                    continue
+
+                if len(batch) >= self.BATCH_SIZE:
+                    self.files_found.emit(batch)
+                    total += len(batch)
+                    batch = []
+
+            # 名前順に処理されるよう逆順に積む
+            stack.extend(reversed(sub_folders))
+
+        if batch:
+            self.files_found.emit(batch)
+            total += len(batch)
+        self.scan_finished.emit(total)
+
+
+class DragDropListView(QListView):
+    """ドラッグ&ドロップ対応のファイルリストビュー"""
+    def __init__(self, model, parent=None):
+        super().__init__(parent)
+        self.setAcceptDrops(True)
+        self.setUniformItemSizes(True)
+        self.setModel(model)
+        self.parent_widget = parent
+
+    def dragEnterEvent(self, event: QDragEnterEvent):
+        if event.mimeData().hasUrls():
+            event.acceptProposedAction()
+
+    def dragMoveEvent(self, event):
+        if event.mimeData().hasUrls():
+            event.acceptProposedAction()
+
+    def dropEvent(self, event: QDropEvent):
+        paths = [url.toLocalFile() for url in event.mimeData().urls() if url.isLocalFile()]
+        if self.parent_widget and hasattr(self.parent_widget, 'add_files_to_current_tab'):
+            self.parent_widget.add_files_to_current_tab(paths)
+
+    def selected_rows(self):
+        """選択されている行番号のリストを取得"""
+        return sorted(index.row() for index in self.selectionModel().selectedRows())
+
+
+class HotFolderJob(QRunnable):
+    """監視フォルダで見つかったファイル1件分の処理"""
+    def __init__(self, watcher, file_path):
+        super().__init__()
+        self.watcher = watcher
+        self.file_path = file_path
+    
+    def run(self):
+        watcher = self.watcher
+        start_time = time.monotonic()
+        watcher.file_started.emit(self.file_path)
+        
+        if watcher.mode == "compress":
+            output_path = os.path.join(watcher.output_dir, f"{Path(self.file_path).stem}_compressed.pdf")
+        else:
+            output_path = watcher.output_dir
+        
+        try:
+            # PDFProcessThreadの処理をこのワーカースレッドで直接実行する
+            # （出力は他のシステムが拾うので、ディスクに書き込まれてから置き換える）
+            job = PDFProcessThread(watcher.mode, [self.file_path], output_path,
+                                   **{'fsync': True, **watcher.kwargs})
+            job.process()
+            success, message = True, job.completion_message("完了")
+        except Exception as e:
+            success, message = False, str(e)
+        
+        # 処理済みのファイルは再処理されないよう移動する
+        destination = watcher.DONE_FOLDER if success else watcher.FAILED_FOLDER
+        try:
+            target_dir = os.path.join(os.path.dirname(self.file_path), destination)
+            os.makedirs(target_dir, exist_ok=True)
+            shutil.move(self.file_path, os.path.join(target_dir, os.path.basename(self.file_path)))
+        except OSError as e:
+            message += f"（ファイルの移動に失敗: {e}）"
+        
+        watcher.file_processed.emit(self.file_path, success, message, time.monotonic() - start_time)
+
+
+class HotFolderWatcher(QObject):
+    """監視フォルダに置かれたPDFを自動で処理する
+    
+    書き込み中のファイルを処理しないよう、サイズと更新日時が一定回数
+    変化しないことと、PDFの終端（%%EOF）があることを確認してから処理する。
+    """
+    file_started = Signal(str)
+    file_processed = Signal(str, bool, str, float)
+    
+    DONE_FOLDER = "processed"
+    FAILED_FOLDER = "failed"
+    DEBOUNCE_MS = 500
+    POLL_INTERVAL_MS = 1000
+    RESCAN_INTERVAL = 5  # ポーリング何回ごとにフォルダを再検索するか
+    STABLE_CHECKS = 2
+    
+    def __init__(self, folders, mode, output_dir, max_workers=2, parent=None, **kwargs):
+        super().__init__(parent)
+        # 処理済み・失敗のフォルダは監視フォルダに含まれていても監視しない（移動したファイルを再処理しない）
+        self.folders = [folder for folder in folders if not self.is_result_folder(folder, folders)]
+        self.mode = mode
+        self.output_dir = output_dir
+        self.kwargs = kwargs
+        self.candidates = {}  # パス -> (サイズ, 更新日時, 安定回数)
+        self.submitted = set()
+        self.poll_count = 0
+        
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_workers)
+        
+        self.fs_watcher = QFileSystemWatcher(self)
+        self.fs_watcher.directoryChanged.connect(self.schedule_scan)
+        
+        self.debounce_timer = QTimer(self)
+        self.debounce_timer.setSingleShot(True)
+        self.debounce_timer.setInterval(self.DEBOUNCE_MS)
+        self.debounce_timer.timeout.connect(self.scan_folders)
+        
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(self.POLL_INTERVAL_MS)
+        self.poll_timer.timeout.connect(self.poll)
+        
+        self.file_processed.connect(self.on_file_processed)
+    
+    @classmethod
+    def is_result_folder(cls, folder, folders):
+        """監視フォルダの中にある処理済み・失敗のフォルダか"""
+        path = Path(folder).resolve()
+        return (path.name in (cls.DONE_FOLDER, cls.FAILED_FOLDER)
+                and any(Path(other).resolve() == path.parent for other in folders))
+    
+    @staticmethod
+    def output_conflict(folders, output_dir):
+        """出力フォルダと同じか、出力フォルダを中に含む監視フォルダを返す（なければNone）
+        
+        出力したPDFが監視フォルダで再び拾われると、処理が際限なく繰り返される。
+        """
+        output = Path(output_dir).resolve()
+        for folder in folders:
+            path = Path(folder).resolve()
+            if output == path or path in output.parents:
+                return folder
+        return None
+    
+    def start(self):
+        """監視を開始（すでに置かれているファイルも処理する）"""
+        conflict = self.output_conflict(self.folders, self.output_dir)
+        if conflict is not None:
+            raise ValueError(f"出力フォルダを監視フォルダ（{conflict}）の中にはできません")
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.fs_watcher.addPaths(self.folders)
+        self.scan_folders()
+        self.poll_timer.start()
+    
+    def stop(self):
+        """監視を停止（待機中のファイルは処理しない）"""
+        self.poll_timer.stop()
+        self.debounce_timer.stop()
+        if self.fs_watcher.directories():
+            self.fs_watcher.removePaths(self.fs_watcher.directories())
+        self.pool.clear()
+        self.candidates.clear()
+    
+    def wait_for_done(self):
+        """処理中のファイルが終わるまで待つ"""
+        self.pool.waitForDone()
+    
+    def schedule_scan(self, path=None):
+        """フォルダの変更通知をまとめてから検索する"""
+        self.debounce_timer.start()
     
-    def dragEnterEvent(self, event: QDragEnterEvent):
-        if event.mimeData().hasUrls():
-            event.acceptProposedAction()
+    def scan_folders(self):
+        """監視フォルダ直下のPDFを候補に追加"""
+        for folder in self.folders:
+            try:
+                with os.scandir(folder) as it:
+                    for entry in it:
+                        if (entry.is_file() and entry.name.lower().endswith('.pdf')
+                                and entry.path not in self.submitted
+                                and entry.path not in self.candidates):
+                            self.candidates[entry.path] = (-1, -1, 0)
+            except OSError:
+                continue
     
-    def dropEvent(self, event: QDropEvent):
-        files = [url.toLocalFile() for url in event.mimeData().urls() 
-                 if url.toLocalFile().lower().endswith('.pdf')]
-        if self.parent_widget and hasattr(self.parent_widget, 'add_files_to_current_tab'):
-            self.parent_widget.add_files_to_current_tab(files)
+    def poll(self):
+        """候補ファイルの書き込みが終わったかを確認して処理を開始"""
+        self.poll_count += 1
+        if self.poll_count % self.RESCAN_INTERVAL == 0:
+            # ネットワーク共有では変更通知が届かないことがあるため定期的に再検索
+            self.scan_folders()
+        
+        for file_path, (last_size, last_mtime, stable) in list(self.candidates.items()):
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                del self.candidates[file_path]
+                continue
+            
+            if (stat.st_size, stat.st_mtime) != (last_size, last_mtime):
+                self.candidates[file_path] = (stat.st_size, stat.st_mtime, 0)
+                continue
+            
+            stable += 1
+            if stable < self.STABLE_CHECKS or not self.is_complete_pdf(file_path):
+                self.candidates[file_path] = (last_size, last_mtime, stable)
+                continue
+            
+            del self.candidates[file_path]
+            self.submitted.add(file_path)
+            self.pool.start(HotFolderJob(self, file_path))
+    
+    @staticmethod
+    def is_complete_pdf(file_path):
+        """PDFの終端まで書き込まれているかを確認"""
+        try:
+            with open(file_path, 'rb') as pdf_file:
+                pdf_file.seek(0, os.SEEK_END)
+                size = pdf_file.tell()
+                pdf_file.seek(max(0, size - 1024))
+                return b'%%EOF' in pdf_file.read()
+        except OSError:
+            # 他のプロセスが書き込み中でロックされている
+            return False
+    
+    def on_file_processed(self, file_path, success, message, elapsed):
+        """移動済みのファイルは、同じ名前で再び置かれたら処理できるようにする"""
+        if not os.path.exists(file_path):
+            self.submitted.discard(file_path)
 
 
 class PDFConverterApp(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.pdf_files = []
+        self.merge_model = PDFFileListModel(self)
+        self.convert_model = PDFFileListModel(self)
+        self.split_model = PDFFileListModel(self)
+        self.compress_model = PDFFileListModel(self)
+        self.watch_folder_model = PDFFileListModel(self)
+        self.images_model = PDFFileListModel(self)
         self.process_thread = None
+        self.scan_threads = []
+        self.hot_folder_watcher = None
+        self.rotate_preview = None
+        self.extract_preview = None
         self.init_ui()
     
     def init_ui(self):
@@ -527,29 +3589,24 @@ class PDFConverterApp(QMainWindow):
         self.tab_widget = QTabWidget()
         main_layout.addWidget(self.tab_widget)
         
-        # タブ1: PDF統合
-        merge_tab = self.create_merge_tab()
-        self.tab_widget.addTab(merge_tab, "📚 PDF統合")
-        
-        # タブ2: PDF→画像変換
-        convert_tab = self.create_convert_tab()
-        self.tab_widget.addTab(convert_tab, "🖼️ 画像変換")
-        
-        # タブ3: PDF分割
-        split_tab = self.create_split_tab()
-        self.tab_widget.addTab(split_tab, "✂️ PDF分割")
-        
-        # タブ4: PDF圧縮
-        compress_tab = self.create_compress_tab()
-        self.tab_widget.addTab(compress_tab, "📦 PDF圧縮")
-        
-        # タブ5: PDF回転（プレビュー付き）
-        rotate_tab = self.create_rotate_tab_with_preview()
-        self.tab_widget.addTab(rotate_tab, "🔄 PDF回転")
-        
-        # タブ6: ページ抽出（プレビュー付き）
-        extract_tab = self.create_extract_tab_with_preview()
-        self.tab_widget.addTab(extract_tab, "📑 ページ抽出")
+        # 各タブの中身は最初に表示されたときに作成する（起動を速くするため）
+        self.tab_builders = [
+            (self.create_merge_tab, "📚 PDF統合"),
+            (self.create_convert_tab, "🖼️ 画像変換"),
+            (self.create_split_tab, "✂️ PDF分割"),
+            (self.create_compress_tab, "📦 PDF圧縮"),
+            (self.create_rotate_tab_with_preview, "🔄 PDF回転"),
+            (self.create_extract_tab_with_preview, "📑 ページ抽出"),
+            (self.create_watch_tab, "👀 フォルダ監視"),
+            (self.create_images_to_pdf_tab, "📷 画像→PDF"),
+        ]
+        self.built_tabs = set()
+        for _, title in self.tab_builders:
+            placeholder = QWidget()
+            QVBoxLayout(placeholder).setContentsMargins(0, 0, 0, 0)
+            self.tab_widget.addTab(placeholder, title)
+        self.tab_widget.currentChanged.connect(self.ensure_tab)
+        self.ensure_tab(self.tab_widget.currentIndex())
         
         # プログレスバー
         self.progress_bar = QProgressBar()
@@ -573,6 +3630,14 @@ class PDFConverterApp(QMainWindow):
         self.status_label.setStyleSheet("font-size: 14px; padding: 5px;")
         main_layout.addWidget(self.status_label)
     
+    def ensure_tab(self, index):
+        """タブの中身がまだなければ作成する"""
+        if index < 0 or index in self.built_tabs:
+            return
+        self.built_tabs.add(index)
+        builder, _ = self.tab_builders[index]
+        self.tab_widget.widget(index).layout().addWidget(builder())
+    
     def create_merge_tab(self):
         """PDF統合タブの作成"""
         tab = QWidget()
@@ -588,9 +3653,9 @@ class PDFConverterApp(QMainWindow):
         file_group = QGroupBox("PDFファイル一覧")
         file_layout = QVBoxLayout()
         
-        # リストウィジェット
-        self.merge_file_list = DragDropListWidget(self)
-        self.merge_file_list.setSelectionMode(QListWidget.SelectionMode.ExtendedSelection)
+        # リストビュー
+        self.merge_file_list = DragDropListView(self.merge_model, self)
+        self.merge_file_list.setSelectionMode(QListView.SelectionMode.ExtendedSelection)
         file_layout.addWidget(self.merge_file_list)
         
         # ボタンレイアウト
@@ -600,6 +3665,10 @@ class PDFConverterApp(QMainWindow):
         add_button.clicked.connect(self.add_files_dialog)
         button_layout.addWidget(add_button)
         
+        add_folder_button = QPushButton("📂 フォルダを追加")
+        add_folder_button.clicked.connect(lambda: self.add_folder_dialog(self.merge_model))
+        button_layout.addWidget(add_folder_button)
+        
         remove_button = QPushButton("🗑️ 選択を削除")
         remove_button.clicked.connect(self.remove_selected_files)
         button_layout.addWidget(remove_button)
@@ -624,6 +3693,21 @@ class PDFConverterApp(QMainWindow):
         file_group.setLayout(file_layout)
         layout.addWidget(file_group)
         
+        # 統合オプション
+        merge_option_group = QGroupBox("統合オプション")
+        merge_option_layout = QVBoxLayout()
+        
+        self.merge_skip_duplicates_check = QCheckBox("🧬 内容が同じページは1回だけ含める")
+        self.merge_skip_duplicates_check.setToolTip("表紙や規約など、まったく同じページが複数ある場合に2回目以降を除外します")
+        merge_option_layout.addWidget(self.merge_skip_duplicates_check)
+        
+        self.merge_linearize_check = QCheckBox("🌐 Web表示用に最適化する（リニアライズ、qpdfが必要）")
+        self.merge_linearize_check.setToolTip("ブラウザなどでダウンロードの完了を待たずに最初のページから表示できるようにします")
+        merge_option_layout.addWidget(self.merge_linearize_check)
+        
+        merge_option_group.setLayout(merge_option_layout)
+        layout.addWidget(merge_option_group)
+        
         # パスワード設定
         password_group = QGroupBox("パスワード設定（オプション）")
         password_layout = QVBoxLayout()
@@ -661,7 +3745,7 @@ class PDFConverterApp(QMainWindow):
         layout = QVBoxLayout(tab)
         
         # 説明ラベル
-        info_label = QLabel("PDFファイルをJPEGまたはPNG画像に変換します")
+        info_label = QLabel("PDFファイルをJPEG・PNG・TIFF（白黒G4・グレースケール、マルチページ）の画像、または画像PDFに変換します")
         info_label.setStyleSheet("font-weight: bold; color: #2c3e50; padding: 10px;")
         layout.addWidget(info_label)
         
@@ -669,9 +3753,9 @@ class PDFConverterApp(QMainWindow):
         file_group = QGroupBox("PDFファイル一覧")
         file_layout = QVBoxLayout()
         
-        # リストウィジェット
-        self.convert_file_list = DragDropListWidget(self)
-        self.convert_file_list.setSelectionMode(QListWidget.SelectionMode.ExtendedSelection)
+        # リストビュー
+        self.convert_file_list = DragDropListView(self.convert_model, self)
+        self.convert_file_list.setSelectionMode(QListView.SelectionMode.ExtendedSelection)
         file_layout.addWidget(self.convert_file_list)
         
         # ボタンレイアウト
@@ -681,6 +3765,10 @@ class PDFConverterApp(QMainWindow):
         add_button.clicked.connect(self.add_files_dialog_convert)
         button_layout.addWidget(add_button)
         
+        add_folder_button = QPushButton("📂 フォルダを追加")
+        add_folder_button.clicked.connect(lambda: self.add_folder_dialog(self.convert_model))
+        button_layout.addWidget(add_folder_button)
+        
         remove_button = QPushButton("🗑️ 選択を削除")
         remove_button.clicked.connect(self.remove_selected_files_convert)
         button_layout.addWidget(remove_button)
@@ -695,6 +3783,7 @@ class PDFConverterApp(QMainWindow):
         
         # 設定グループ
         settings_group = QGroupBox("変換設定")
+        settings_group_layout = QVBoxLayout()
         settings_layout = QHBoxLayout()
         
         # 画像フォーマット選択
@@ -702,7 +3791,15 @@ class PDFConverterApp(QMainWindow):
         settings_layout.addWidget(format_label)
         
         self.format_combo = QComboBox()
-        self.format_combo.addItems(["JPEG", "PNG"])
+        self.format_combo.addItem("JPEG", "JPEG")
+        self.format_combo.addItem("PNG", "PNG")
+        self.format_combo.addItem("PNG（グレースケール）", "PNG_GRAY")
+        self.format_combo.addItem("TIFF（白黒 CCITT G4）", "TIFF_G4")
+        self.format_combo.addItem("マルチページTIFF（白黒 CCITT G4）", "TIFF_MULTI_G4")
+        self.format_combo.addItem("マルチページTIFF（グレースケール）", "TIFF_MULTI_GRAY")
+        self.format_combo.addItem("画像PDF（カラー）", "PDF_IMAGE")
+        self.format_combo.addItem("画像PDF（白黒）", "PDF_IMAGE_BILEVEL")
+        self.format_combo.currentIndexChanged.connect(self.update_convert_options)
         settings_layout.addWidget(self.format_combo)
         
         # DPI設定
@@ -715,9 +3812,49 @@ class PDFConverterApp(QMainWindow):
         self.dpi_spinbox.setSuffix(" dpi")
         settings_layout.addWidget(self.dpi_spinbox)
         
+        # 色（カラーの出力形式のとき、白黒のページをグレースケールで描画する）
+        self.color_label = QLabel("色:")
+        settings_layout.addWidget(self.color_label)
+        
+        self.color_combo = QComboBox()
+        self.color_combo.addItem("カラー", "color")
+        self.color_combo.addItem("自動判定", "auto")
+        self.color_combo.addItem("グレースケール", "gray")
+        self.color_combo.addItem("白黒", "bilevel")
+        self.color_combo.setToolTip("自動判定では、色のないページをグレースケールで描画します")
+        self.color_combo.currentIndexChanged.connect(self.update_convert_options)
+        settings_layout.addWidget(self.color_combo)
         settings_layout.addStretch()
-        settings_group.setLayout(settings_layout)
+        settings_group_layout.addLayout(settings_layout)
+        
+        # 後処理（スキャン文書向け）
+        postprocess_layout = QHBoxLayout()
+        
+        self.threshold_label = QLabel("白黒しきい値:")
+        postprocess_layout.addWidget(self.threshold_label)
+        
+        self.threshold_spinbox = QSpinBox()
+        self.threshold_spinbox.setRange(0, 255)
+        self.threshold_spinbox.setValue(0)
+        self.threshold_spinbox.setSpecialValueText("自動")
+        postprocess_layout.addWidget(self.threshold_spinbox)
+        
+        self.auto_crop_check = QCheckBox("余白を自動トリミング")
+        postprocess_layout.addWidget(self.auto_crop_check)
+        
+        downsample_label = QLabel("縮小:")
+        postprocess_layout.addWidget(downsample_label)
+        
+        self.downsample_combo = QComboBox()
+        for factor in (1, 2, 3, 4):
+            self.downsample_combo.addItem("なし" if factor == 1 else f"1/{factor}", factor)
+        postprocess_layout.addWidget(self.downsample_combo)
+        
+        postprocess_layout.addStretch()
+        settings_group_layout.addLayout(postprocess_layout)
+        settings_group.setLayout(settings_group_layout)
         layout.addWidget(settings_group)
+        self.update_convert_options()
         
         # 変換実行ボタン
         convert_button = QPushButton("🖼️ 画像に変換")
@@ -744,29 +3881,51 @@ class PDFConverterApp(QMainWindow):
         tab = QWidget()
         layout = QVBoxLayout(tab)
         
-        info_label = QLabel("PDFファイルを1ページずつ分割します")
+        info_label = QLabel("PDFファイルを1ページずつ、または指定したファイルサイズ以下になるように分割します")
         info_label.setStyleSheet("font-weight: bold; color: #2c3e50; padding: 10px;")
+        info_label.setWordWrap(True)
         layout.addWidget(info_label)
         
         file_group = QGroupBox("PDFファイル選択")
         file_layout = QVBoxLayout()
         
-        self.split_file_list = DragDropListWidget(self)
+        self.split_file_list = DragDropListView(self.split_model, self)
         file_layout.addWidget(self.split_file_list)
         
         button_layout = QHBoxLayout()
         add_button = QPushButton("📁 ファイルを選択")
-        add_button.clicked.connect(lambda: self.add_single_file(self.split_file_list))
+        add_button.clicked.connect(lambda: self.add_single_file(self.split_model))
         button_layout.addWidget(add_button)
         
         clear_button = QPushButton("🧹 クリア")
-        clear_button.clicked.connect(lambda: self.split_file_list.clear())
+        clear_button.clicked.connect(self.split_model.clear)
         button_layout.addWidget(clear_button)
         
         file_layout.addLayout(button_layout)
         file_group.setLayout(file_layout)
         layout.addWidget(file_group)
         
+        # 分割方法
+        method_group = QGroupBox("分割方法")
+        method_layout = QHBoxLayout()
+        
+        self.split_by_page_radio = QRadioButton("1ページずつ")
+        self.split_by_page_radio.setChecked(True)
+        method_layout.addWidget(self.split_by_page_radio)
+        
+        self.split_by_size_radio = QRadioButton("ファイルサイズで分割（上限）:")
+        method_layout.addWidget(self.split_by_size_radio)
+        
+        self.split_size_spinbox = QSpinBox()
+        self.split_size_spinbox.setRange(1, 2000)
+        self.split_size_spinbox.setValue(10)
+        self.split_size_spinbox.setSuffix(" MB")
+        method_layout.addWidget(self.split_size_spinbox)
+        
+        method_layout.addStretch()
+        method_group.setLayout(method_layout)
+        layout.addWidget(method_group)
+        
         split_button = QPushButton("✂️ PDFを分割")
         split_button.setStyleSheet("""
             QPushButton {
@@ -798,22 +3957,52 @@ class PDFConverterApp(QMainWindow):
         file_group = QGroupBox("PDFファイル選択")
         file_layout = QVBoxLayout()
         
-        self.compress_file_list = DragDropListWidget(self)
+        self.compress_file_list = DragDropListView(self.compress_model, self)
         file_layout.addWidget(self.compress_file_list)
         
         button_layout = QHBoxLayout()
         add_button = QPushButton("📁 ファイルを選択")
-        add_button.clicked.connect(lambda: self.add_single_file(self.compress_file_list))
+        add_button.clicked.connect(lambda: self.add_single_file(self.compress_model))
         button_layout.addWidget(add_button)
         
         clear_button = QPushButton("🧹 クリア")
-        clear_button.clicked.connect(lambda: self.compress_file_list.clear())
+        clear_button.clicked.connect(self.compress_model.clear)
         button_layout.addWidget(clear_button)
         
         file_layout.addLayout(button_layout)
         file_group.setLayout(file_layout)
         layout.addWidget(file_group)
         
+        compress_option_group = QGroupBox("圧縮オプション")
+        compress_option_layout = QVBoxLayout()
+        
+        self.compress_fonts_check = QCheckBox("🔤 フォントを最適化する（未使用フォントの削除・重複の統合・サブセット化）")
+        self.compress_fonts_check.setToolTip("埋め込みフォントを実際に使われている文字だけにします")
+        self.compress_fonts_check.setChecked(True)
+        compress_option_layout.addWidget(self.compress_fonts_check)
+        
+        level_layout = QHBoxLayout()
+        level_layout.addWidget(QLabel("圧縮レベル:"))
+        self.compress_level_combo = QComboBox()
+        self.compress_level_combo.addItem("⚡ 速度優先", 1)
+        self.compress_level_combo.addItem("標準", DEFAULT_FLATE_LEVEL)
+        self.compress_level_combo.addItem("📉 圧縮率優先", 9)
+        self.compress_level_combo.setCurrentIndex(1)
+        level_layout.addWidget(self.compress_level_combo)
+        level_layout.addStretch()
+        compress_option_layout.addLayout(level_layout)
+        
+        self.compress_recompress_check = QCheckBox("♻️ 圧縮済みのストリームも指定したレベルで圧縮し直す")
+        self.compress_recompress_check.setToolTip("圧縮率優先と組み合わせると、低いレベルで圧縮されたPDFをさらに小さくできます")
+        compress_option_layout.addWidget(self.compress_recompress_check)
+        
+        self.compress_linearize_check = QCheckBox("🌐 Web表示用に最適化する（リニアライズ、qpdfが必要）")
+        self.compress_linearize_check.setToolTip("ブラウザなどでダウンロードの完了を待たずに最初のページから表示できるようにします")
+        compress_option_layout.addWidget(self.compress_linearize_check)
+        
+        compress_option_group.setLayout(compress_option_layout)
+        layout.addWidget(compress_option_group)
+        
         compress_button = QPushButton("📦 PDFを圧縮")
         compress_button.setStyleSheet("""
             QPushButton {
@@ -972,6 +4161,23 @@ class PDFConverterApp(QMainWindow):
         # プレビューウィジェットを追加
         layout.addWidget(self.extract_preview)
         
+        # 抽出と同時に回転
+        angle_group = QGroupBox("抽出と同時に回転（オプション）")
+        angle_layout = QHBoxLayout()
+        
+        self.extract_angle_group = QButtonGroup()
+        
+        for angle in [0, 90, 180, 270]:
+            radio = QRadioButton("回転しない" if angle == 0 else f"{angle}度（時計回り）")
+            self.extract_angle_group.addButton(radio, angle)
+            angle_layout.addWidget(radio)
+            if angle == 0:
+                radio.setChecked(True)
+        
+        angle_layout.addStretch()
+        angle_group.setLayout(angle_layout)
+        layout.addWidget(angle_group)
+        
         # パスワード設定
         password_group = QGroupBox("パスワード設定（オプション）")
         password_layout = QVBoxLayout()
@@ -1002,6 +4208,173 @@ class PDFConverterApp(QMainWindow):
         
         return tab
     
+    def create_watch_tab(self):
+        """フォルダ監視タブの作成"""
+        tab = QWidget()
+        layout = QVBoxLayout(tab)
+        
+        info_label = QLabel("監視フォルダに置かれたPDFを自動で処理します。"
+                            "処理が終わったファイルは監視フォルダ内の「processed」（失敗時は「failed」）に移動します。")
+        info_label.setStyleSheet("font-weight: bold; color: #2c3e50; padding: 10px;")
+        info_label.setWordWrap(True)
+        layout.addWidget(info_label)
+        
+        # 監視フォルダ一覧
+        folder_group = QGroupBox("監視フォルダ一覧")
+        folder_layout = QVBoxLayout()
+        
+        self.watch_folder_list = DragDropListView(self.watch_folder_model, self)
+        self.watch_folder_list.setSelectionMode(QListView.SelectionMode.ExtendedSelection)
+        folder_layout.addWidget(self.watch_folder_list)
+        
+        button_layout = QHBoxLayout()
+        add_button = QPushButton("📂 フォルダを追加")
+        add_button.clicked.connect(self.add_watch_folder_dialog)
+        button_layout.addWidget(add_button)
+        
+        remove_button = QPushButton("🗑️ 選択を削除")
+        remove_button.clicked.connect(
+            lambda: self.watch_folder_model.remove_rows(self.watch_folder_list.selected_rows()))
+        button_layout.addWidget(remove_button)
+        
+        folder_layout.addLayout(button_layout)
+        folder_group.setLayout(folder_layout)
+        layout.addWidget(folder_group)
+        
+        # 処理設定
+        settings_group = QGroupBox("処理設定")
+        settings_layout = QFormLayout()
+        
+        self.watch_mode_combo = QComboBox()
+        self.watch_mode_combo.addItem("📦 PDF圧縮", "compress")
+        self.watch_mode_combo.addItem("🖼️ 画像変換（画像変換タブの設定を使用）", "convert")
+        self.watch_mode_combo.addItem("✂️ PDF分割", "split")
+        settings_layout.addRow("処理内容:", self.watch_mode_combo)
+        
+        output_layout = QHBoxLayout()
+        self.watch_output_edit = QLineEdit()
+        output_layout.addWidget(self.watch_output_edit)
+        output_button = QPushButton("📁 選択")
+        output_button.clicked.connect(self.select_watch_output_dir)
+        output_layout.addWidget(output_button)
+        settings_layout.addRow("出力フォルダ:", output_layout)
+        
+        self.watch_workers_spinbox = QSpinBox()
+        self.watch_workers_spinbox.setRange(1, max(1, os.cpu_count() or 1))
+        self.watch_workers_spinbox.setValue(min(2, self.watch_workers_spinbox.maximum()))
+        settings_layout.addRow("同時処理数:", self.watch_workers_spinbox)
+        
+        settings_group.setLayout(settings_layout)
+        layout.addWidget(settings_group)
+        
+        # ログ
+        self.watch_log = QTextEdit()
+        self.watch_log.setReadOnly(True)
+        layout.addWidget(self.watch_log)
+        
+        self.watch_button = QPushButton("👀 監視を開始")
+        self.watch_button.setStyleSheet("""
+            QPushButton {
+                background-color: #2c3e50;
+                color: white;
+                font-size: 16px;
+                font-weight: bold;
+                padding: 12px;
+                border-radius: 5px;
+            }
+            QPushButton:hover {
+                background-color: #1a252f;
+            }
+        """)
+        self.watch_button.clicked.connect(self.toggle_watch)
+        layout.addWidget(self.watch_button)
+        
+        return tab
+    
+    def create_images_to_pdf_tab(self):
+        """画像→PDFタブの作成"""
+        tab = QWidget()
+        layout = QVBoxLayout(tab)
+        
+        info_label = QLabel("スキャンした画像（JPEG/PNG/TIFF）を並べた順に1つのPDFにまとめます。"
+                            "JPEGなどは画質を落とさずにそのまま格納します。")
+        info_label.setStyleSheet("font-weight: bold; color: #2c3e50; padding: 10px;")
+        info_label.setWordWrap(True)
+        layout.addWidget(info_label)
+        
+        file_group = QGroupBox("画像ファイル一覧")
+        file_layout = QVBoxLayout()
+        
+        self.images_file_list = DragDropListView(self.images_model, self)
+        self.images_file_list.setSelectionMode(QListView.SelectionMode.ExtendedSelection)
+        file_layout.addWidget(self.images_file_list)
+        
+        button_layout = QHBoxLayout()
+        
+        add_button = QPushButton("📁 ファイルを追加")
+        add_button.clicked.connect(self.add_image_files_dialog)
+        button_layout.addWidget(add_button)
+        
+        add_folder_button = QPushButton("📂 フォルダを追加")
+        add_folder_button.clicked.connect(self.add_image_folder_dialog)
+        button_layout.addWidget(add_folder_button)
+        
+        remove_button = QPushButton("🗑️ 選択を削除")
+        remove_button.clicked.connect(
+            lambda: self.images_model.remove_rows(self.images_file_list.selected_rows()))
+        button_layout.addWidget(remove_button)
+        
+        clear_button = QPushButton("🧹 すべてクリア")
+        clear_button.clicked.connect(self.images_model.clear)
+        button_layout.addWidget(clear_button)
+        
+        up_button = QPushButton("⬆️ 上へ")
+        up_button.clicked.connect(lambda: self.move_image(-1))
+        button_layout.addWidget(up_button)
+        
+        down_button = QPushButton("⬇️ 下へ")
+        down_button.clicked.connect(lambda: self.move_image(1))
+        button_layout.addWidget(down_button)
+        
+        file_layout.addLayout(button_layout)
+        file_group.setLayout(file_layout)
+        layout.addWidget(file_group)
+        
+        settings_group = QGroupBox("作成設定")
+        settings_layout = QHBoxLayout()
+        
+        dpi_label = QLabel("解像度の記録がない画像の解像度:")
+        settings_layout.addWidget(dpi_label)
+        
+        self.images_dpi_spinbox = QSpinBox()
+        self.images_dpi_spinbox.setRange(72, 1200)
+        self.images_dpi_spinbox.setValue(200)
+        self.images_dpi_spinbox.setSuffix(" dpi")
+        settings_layout.addWidget(self.images_dpi_spinbox)
+        
+        settings_layout.addStretch()
+        settings_group.setLayout(settings_layout)
+        layout.addWidget(settings_group)
+        
+        create_button = QPushButton("📄 PDFを作成")
+        create_button.setStyleSheet("""
+            QPushButton {
+                background-color: #16a085;
+                color: white;
+                font-size: 16px;
+                font-weight: bold;
+                padding: 12px;
+                border-radius: 5px;
+            }
+            QPushButton:hover {
+                background-color: #138d75;
+            }
+        """)
+        create_button.clicked.connect(self.images_to_pdf)
+        layout.addWidget(create_button)
+        
+        return tab
+    
     def add_files_dialog(self):
         """ファイル選択ダイアログを開く（統合用）"""
         files, _ = QFileDialog.getOpenFileNames(
@@ -1024,7 +4397,37 @@ class PDFConverterApp(QMainWindow):
         if files:
             self.add_files_convert(files)
     
-    def add_single_file(self, list_widget):
+    def add_folder_dialog(self, model):
+        """フォルダ選択ダイアログを開く（中のPDFを再帰的に追加）"""
+        folder = QFileDialog.getExistingDirectory(self, "PDFを含むフォルダを選択")
+        if folder:
+            self.scan_folders([folder], model)
+    
+    def add_image_files_dialog(self):
+        """ファイル選択ダイアログを開く（画像→PDF用）"""
+        patterns = " ".join(f"*{extension}" for extension in IMAGE_INPUT_EXTENSIONS)
+        files, _ = QFileDialog.getOpenFileNames(
+            self,
+            "画像ファイルを選択",
+            "",
+            f"Images ({patterns})"
+        )
+        if files:
+            self.images_model.add_files(files)
+    
+    def add_image_folder_dialog(self):
+        """フォルダ選択ダイアログを開く（中の画像を再帰的に追加）"""
+        folder = QFileDialog.getExistingDirectory(self, "画像を含むフォルダを選択")
+        if folder:
+            self.scan_folders([folder], self.images_model, IMAGE_INPUT_EXTENSIONS)
+    
+    def move_image(self, offset):
+        """選択された画像を上下に移動"""
+        current_row = self.images_file_list.currentIndex().row()
+        if self.images_model.move_row(current_row, offset):
+            self.images_file_list.setCurrentIndex(self.images_model.index(current_row + offset))
+    
+    def add_single_file(self, model):
         """単一ファイル選択"""
         file, _ = QFileDialog.getOpenFileName(
             self,
@@ -1033,103 +4436,102 @@ class PDFConverterApp(QMainWindow):
             "PDF Files (*.pdf)"
         )
         if file:
-            list_widget.clear()
-            list_widget.addItem(Path(file).name)
-            list_widget.item(0).setData(Qt.ItemDataRole.UserRole, file)
+            model.set_file(file)
     
     def add_files(self, files):
         """ファイルをリストに追加（統合用）"""
-        for file in files:
-            if file not in self.pdf_files:
-                self.pdf_files.append(file)
-                self.merge_file_list.addItem(Path(file).name)
+        self.merge_model.add_files(files)
         self.update_status()
     
     def add_files_convert(self, files):
         """ファイルをリストに追加（変換用）"""
-        for file in files:
-            items = [self.convert_file_list.item(i).data(Qt.ItemDataRole.UserRole) 
-                    for i in range(self.convert_file_list.count())]
-            if file not in items:
-                self.convert_file_list.addItem(Path(file).name)
-                self.convert_file_list.item(self.convert_file_list.count() - 1).setData(
-                    Qt.ItemDataRole.UserRole, file)
+        self.convert_model.add_files(files)
+        self.update_status()
+    
+    def scan_folders(self, folders, model, extensions=('.pdf',)):
+        """フォルダ内のPDF（またはextensionsのファイル）をバックグラウンドで検索してモデルに追加"""
+        thread = FolderScanThread(folders, extensions)
+        thread.files_found.connect(model.add_files)
+        thread.scan_finished.connect(self.folder_scan_finished)
+        self.scan_threads.append(thread)
+        self.status_label.setText("📂 フォルダを検索中...")
+        thread.start()
+    
+    def folder_scan_finished(self, total):
+        """フォルダ検索完了時の処理"""
+        thread = self.sender()
+        if thread in self.scan_threads:
+            thread.wait()
+            self.scan_threads.remove(thread)
         self.update_status()
     
-    def add_files_to_current_tab(self, files):
+    def add_files_to_current_tab(self, paths):
         """現在のタブに応じてファイルを追加"""
+        files = [p for p in paths if p.lower().endswith('.pdf') and not os.path.isdir(p)]
+        folders = [p for p in paths if os.path.isdir(p)]
+        
         current_index = self.tab_widget.currentIndex()
         if current_index == 0:  # 統合タブ
             self.add_files(files)
+            if folders:
+                self.scan_folders(folders, self.merge_model)
         elif current_index == 1:  # 変換タブ
             self.add_files_convert(files)
+            if folders:
+                self.scan_folders(folders, self.convert_model)
         elif current_index == 2 and files:  # 分割タブ
-            self.split_file_list.clear()
-            self.split_file_list.addItem(Path(files[0]).name)
-            self.split_file_list.item(0).setData(Qt.ItemDataRole.UserRole, files[0])
+            self.split_model.set_file(files[0])
         elif current_index == 3 and files:  # 圧縮タブ
-            self.compress_file_list.clear()
-            self.compress_file_list.addItem(Path(files[0]).name)
-            self.compress_file_list.item(0).setData(Qt.ItemDataRole.UserRole, files[0])
+            self.compress_model.set_file(files[0])
         elif current_index == 4 and files:  # 回転タブ
             self.rotate_preview.load_pdf(files[0])
         elif current_index == 5 and files:  # 抽出タブ
             self.extract_preview.load_pdf(files[0])
+        elif current_index == 6:  # フォルダ監視タブ
+            self.watch_folder_model.add_files(folders)
+        elif current_index == 7:  # 画像→PDFタブ
+            self.images_model.add_files(
+                [p for p in paths if p.lower().endswith(IMAGE_INPUT_EXTENSIONS) and not os.path.isdir(p)])
+            if folders:
+                self.scan_folders(folders, self.images_model, IMAGE_INPUT_EXTENSIONS)
     
     def remove_selected_files(self):
         """選択されたファイルを削除（統合用）"""
-        for item in self.merge_file_list.selectedItems():
-            row = self.merge_file_list.row(item)
-            self.merge_file_list.takeItem(row)
-            del self.pdf_files[row]
+        self.merge_model.remove_rows(self.merge_file_list.selected_rows())
         self.update_status()
     
     def remove_selected_files_convert(self):
         """選択されたファイルを削除（変換用）"""
-        for item in self.convert_file_list.selectedItems():
-            row = self.convert_file_list.row(item)
-            self.convert_file_list.takeItem(row)
+        self.convert_model.remove_rows(self.convert_file_list.selected_rows())
         self.update_status()
     
     def clear_all_files(self):
         """すべてのファイルをクリア（統合用）"""
-        self.merge_file_list.clear()
-        self.pdf_files.clear()
+        self.merge_model.clear()
         self.update_status()
     
     def clear_all_files_convert(self):
         """すべてのファイルをクリア（変換用）"""
-        self.convert_file_list.clear()
+        self.convert_model.clear()
         self.update_status()
     
     def move_up(self):
         """選択されたファイルを上に移動"""
-        current_row = self.merge_file_list.currentRow()
-        if current_row > 0:
-            current_item = self.merge_file_list.takeItem(current_row)
-            self.merge_file_list.insertItem(current_row - 1, current_item)
-            self.merge_file_list.setCurrentRow(current_row - 1)
-            
-            self.pdf_files[current_row], self.pdf_files[current_row - 1] = \
-                self.pdf_files[current_row - 1], self.pdf_files[current_row]
+        current_row = self.merge_file_list.currentIndex().row()
+        if self.merge_model.move_row(current_row, -1):
+            self.merge_file_list.setCurrentIndex(self.merge_model.index(current_row - 1))
     
     def move_down(self):
         """選択されたファイルを下に移動"""
-        current_row = self.merge_file_list.currentRow()
-        if current_row < self.merge_file_list.count() - 1 and current_row >= 0:
-            current_item = self.merge_file_list.takeItem(current_row)
-            self.merge_file_list.insertItem(current_row + 1, current_item)
-            self.merge_file_list.setCurrentRow(current_row + 1)
-            
-            self.pdf_files[current_row], self.pdf_files[current_row + 1] = \
-                self.pdf_files[current_row + 1], self.pdf_files[current_row]
+        current_row = self.merge_file_list.currentIndex().row()
+        if self.merge_model.move_row(current_row, 1):
+            self.merge_file_list.setCurrentIndex(self.merge_model.index(current_row + 1))
     
     def show_pdf_info(self):
         """PDFの情報を表示"""
-        current_item = self.merge_file_list.currentItem()
-        if current_item:
-            row = self.merge_file_list.row(current_item)
-            file_path = self.pdf_files[row]
+        current_index = self.merge_file_list.currentIndex()
+        if current_index.isValid():
+            file_path = self.merge_model.file_at(current_index.row())
             dialog = PDFInfoDialog(file_path, self)
             dialog.exec()
         else:
@@ -1137,7 +4539,7 @@ class PDFConverterApp(QMainWindow):
     
     def merge_pdfs(self):
         """PDFを統合"""
-        if not self.pdf_files:
+        if self.merge_model.rowCount() == 0:
             QMessageBox.warning(self, "警告", "PDFファイルが選択されていません")
             return
         
@@ -1150,6 +4552,10 @@ class PDFConverterApp(QMainWindow):
         
         if output_file:
             kwargs = {}
+            if self.merge_skip_duplicates_check.isChecked():
+                kwargs['skip_duplicate_pages'] = True
+            if self.merge_linearize_check.isChecked():
+                kwargs['linearize'] = True
             
             # 出力PDFのパスワード設定
             if self.merge_password_check.isChecked():
@@ -1159,11 +4565,28 @@ class PDFConverterApp(QMainWindow):
                 else:
                     return
             
-            self.start_process("merge", self.pdf_files, output_file, **kwargs)
+            self.start_process("merge", self.merge_model.files(), output_file, **kwargs)
+    
+    def images_to_pdf(self):
+        """画像からPDFを作成"""
+        if self.images_model.rowCount() == 0:
+            QMessageBox.warning(self, "警告", "画像ファイルが選択されていません")
+            return
+        
+        output_file, _ = QFileDialog.getSaveFileName(
+            self,
+            "PDFを保存",
+            "images.pdf",
+            "PDF Files (*.pdf)"
+        )
+        
+        if output_file:
+            self.start_process("images_to_pdf", self.images_model.files(), output_file,
+                               dpi=self.images_dpi_spinbox.value())
     
     def convert_to_images(self):
         """PDFを画像に変換"""
-        if self.convert_file_list.count() == 0:
+        if self.convert_model.rowCount() == 0:
             QMessageBox.warning(self, "警告", "PDFファイルが選択されていません")
             return
         
@@ -1173,19 +4596,35 @@ class PDFConverterApp(QMainWindow):
         )
         
         if output_dir:
-            files = [self.convert_file_list.item(i).data(Qt.ItemDataRole.UserRole) 
-                    for i in range(self.convert_file_list.count())]
-            
-            kwargs = {
-                'image_format': self.format_combo.currentText(),
-                'dpi': self.dpi_spinbox.value()
-            }
+            files = self.convert_model.files()
             
-            self.start_process("convert", files, output_dir, **kwargs)
+            self.start_process("convert", files, output_dir, **self.convert_options())
+    
+    def update_convert_options(self):
+        """色の指定はカラーの出力形式のときだけ、しきい値は白黒で出力するときだけ設定できるようにする"""
+        color_mode = IMAGE_OUTPUT_FORMATS[self.format_combo.currentData()].color_mode
+        self.color_label.setEnabled(color_mode == 'rgb')
+        self.color_combo.setEnabled(color_mode == 'rgb')
+        bilevel = color_mode == 'bilevel' or (
+            color_mode == 'rgb' and self.color_combo.currentData() == 'bilevel')
+        self.threshold_label.setEnabled(bilevel)
+        self.threshold_spinbox.setEnabled(bilevel)
+    
+    def convert_options(self):
+        """画像変換タブの設定をPDFProcessThreadの引数にする"""
+        threshold = self.threshold_spinbox.value()
+        return {
+            'image_format': self.format_combo.currentData(),
+            'dpi': self.dpi_spinbox.value(),
+            'threshold': threshold or None,
+            'auto_crop': self.auto_crop_check.isChecked(),
+            'downsample': self.downsample_combo.currentData(),
+            'color_detection': self.color_combo.currentData(),
+        }
     
     def split_pdf(self):
         """PDFを分割"""
-        if self.split_file_list.count() == 0:
+        if self.split_model.rowCount() == 0:
             QMessageBox.warning(self, "警告", "PDFファイルが選択されていません")
             return
         
@@ -1195,16 +4634,20 @@ class PDFConverterApp(QMainWindow):
         )
         
         if output_dir:
-            file_path = self.split_file_list.item(0).data(Qt.ItemDataRole.UserRole)
-            self.start_process("split", [file_path], output_dir)
+            file_path = self.split_model.file_at(0)
+            kwargs = {}
+            if self.split_by_size_radio.isChecked():
+                # アップロード上限を超えないよう1MB = 1,000,000バイトで計算する
+                kwargs['max_bytes'] = self.split_size_spinbox.value() * 1000 * 1000
+            self.start_process("split", [file_path], output_dir, **kwargs)
     
     def compress_pdf(self):
         """PDFを圧縮"""
-        if self.compress_file_list.count() == 0:
+        if self.compress_model.rowCount() == 0:
             QMessageBox.warning(self, "警告", "PDFファイルが選択されていません")
             return
         
-        file_path = self.compress_file_list.item(0).data(Qt.ItemDataRole.UserRole)
+        file_path = self.compress_model.file_at(0)
         base_name = Path(file_path).stem
         
         output_file, _ = QFileDialog.getSaveFileName(
@@ -1215,7 +4658,11 @@ class PDFConverterApp(QMainWindow):
         )
         
         if output_file:
-            self.start_process("compress", [file_path], output_file)
+            self.start_process("compress", [file_path], output_file,
+                               optimize_fonts=self.compress_fonts_check.isChecked(),
+                               compression_level=self.compress_level_combo.currentData(),
+                               recompress_flate=self.compress_recompress_check.isChecked(),
+                               linearize=self.compress_linearize_check.isChecked())
     
     def rotate_pdf(self):
         """PDFを回転（選択されたページのみ）"""
@@ -1275,7 +4722,10 @@ class PDFConverterApp(QMainWindow):
         )
         
         if output_file:
-            kwargs = {'pages': selected_pages}
+            kwargs = {
+                'pages': selected_pages,
+                'angle': self.extract_angle_group.checkedId()
+            }
             
             # パスワード設定
             if self.extract_password_check.isChecked():
@@ -1287,6 +4737,72 @@ class PDFConverterApp(QMainWindow):
             
             self.start_process("extract_pages", [pdf_path], output_file, **kwargs)
     
+    def add_watch_folder_dialog(self):
+        """監視フォルダを追加"""
+        folder = QFileDialog.getExistingDirectory(self, "監視するフォルダを選択")
+        if folder:
+            self.watch_folder_model.add_files([folder])
+    
+    def select_watch_output_dir(self):
+        """監視モードの出力フォルダを選択"""
+        folder = QFileDialog.getExistingDirectory(self, "出力フォルダを選択")
+        if folder:
+            self.watch_output_edit.setText(folder)
+    
+    def toggle_watch(self):
+        """フォルダ監視の開始・停止"""
+        if self.hot_folder_watcher is not None:
+            self.hot_folder_watcher.stop()
+            self.hot_folder_watcher = None
+            self.watch_button.setText("👀 監視を開始")
+            self.append_watch_log("⏹️ 監視を停止しました")
+            return
+        
+        folders = self.watch_folder_model.files()
+        output_dir = self.watch_output_edit.text().strip()
+        if not folders:
+            QMessageBox.warning(self, "警告", "監視フォルダを追加してください")
+            return
+        if not output_dir:
+            QMessageBox.warning(self, "警告", "出力フォルダを選択してください")
+            return
+        conflict = HotFolderWatcher.output_conflict(folders, output_dir)
+        if conflict is not None:
+            QMessageBox.warning(self, "警告",
+                                f"出力フォルダが監視フォルダ（{conflict}）の中にあります。\n"
+                                "出力したPDFが再び処理されてしまうため、別のフォルダを選択してください")
+            return
+        
+        mode = self.watch_mode_combo.currentData()
+        kwargs = {}
+        if mode == "convert":
+            self.ensure_tab(1)  # 画像変換タブの設定を使う
+            kwargs = self.convert_options()
+        
+        self.hot_folder_watcher = HotFolderWatcher(
+            folders, mode, output_dir, self.watch_workers_spinbox.value(), self, **kwargs)
+        self.hot_folder_watcher.file_started.connect(
+            lambda path: self.append_watch_log(f"⏳ 処理開始: {Path(path).name}"))
+        self.hot_folder_watcher.file_processed.connect(self.on_watch_file_processed)
+        try:
+            self.hot_folder_watcher.start()
+        except (OSError, ValueError) as e:
+            self.hot_folder_watcher = None
+            QMessageBox.critical(self, "エラー", f"監視を開始できませんでした: {str(e)}")
+            return
+        
+        self.watch_button.setText("⏹️ 監視を停止")
+        self.append_watch_log(f"▶️ 監視を開始しました（{len(folders)}フォルダ）")
+    
+    def on_watch_file_processed(self, file_path, success, message, elapsed):
+        """監視フォルダのファイル処理完了時の処理"""
+        icon = "✅" if success else "❌"
+        self.append_watch_log(f"{icon} {Path(file_path).name}: {message}（{elapsed:.1f}秒）")
+    
+    def append_watch_log(self, text):
+        """監視ログに1行追加"""
+        self.watch_log.append(f"[{time.strftime('%H:%M:%S')}] {text}")
+    
     def start_process(self, mode, files, output_path, **kwargs):
         """処理を開始"""
         self.progress_bar.setVisible(True)
@@ -1295,6 +4811,7 @@ class PDFConverterApp(QMainWindow):
         
         self.process_thread = PDFProcessThread(mode, files, output_path, **kwargs)
         self.process_thread.progress.connect(self.update_progress)
+        self.process_thread.metrics.connect(self.update_metrics)
         self.process_thread.finished.connect(self.process_finished)
         self.process_thread.start()
     
@@ -1302,6 +4819,21 @@ class PDFConverterApp(QMainWindow):
         """プログレスバーを更新"""
         self.progress_bar.setValue(value)
     
+    def update_metrics(self, metrics):
+        """処理速度・経過時間・残り時間をステータスに表示"""
+        parts = []
+        if metrics["current_file"]:
+            current = metrics["current_file"]
+            if metrics["current_page"]:
+                current += f" {metrics['current_page']}ページ目"
+            parts.append(f"⏳ {current}")
+        parts.append(f"{metrics['pages_per_second']:.1f} ページ/秒")
+        parts.append(f"{metrics['mb_per_second']:.2f} MB/秒")
+        parts.append(f"経過 {format_duration(metrics['elapsed'])}")
+        if metrics["eta"] is not None:
+            parts.append(f"残り 約{format_duration(metrics['eta'])}")
+        self.status_label.setText(" | ".join(parts))
+    
     def process_finished(self, success, message):
         """処理完了時の処理"""
         self.progress_bar.setVisible(False)
@@ -1312,17 +4844,431 @@ class PDFConverterApp(QMainWindow):
         else:
             QMessageBox.critical(self, "エラー", message)
     
+    def closeEvent(self, event):
+        """ウィンドウを閉じる時にバックグラウンドの処理を停止"""
+        for preview in (self.rotate_preview, self.extract_preview):
+            if preview is not None:
+                preview.stop_rendering()
+        for thread in list(self.scan_threads):
+            thread.requestInterruption()
+            thread.wait()
+        if self.hot_folder_watcher is not None:
+            self.hot_folder_watcher.stop()
+            self.hot_folder_watcher.wait_for_done()
+        super().closeEvent(event)
+    
     def update_status(self):
         """ステータスを更新"""
-        merge_count = self.merge_file_list.count()
-        convert_count = self.convert_file_list.count()
+        merge_count = self.merge_model.rowCount()
+        convert_count = self.convert_model.rowCount()
         self.status_label.setText(
             f"📚 統合: {merge_count}件 | 🖼️ 変換: {convert_count}件"
         )
 
 
+class PDFJobService:
+    """PDFProcessThreadの処理をHTTP経由で提供するジョブサービス"""
+    # HTTPで受け付ける処理名 -> PDFProcessThreadのモード
+    MODES = {
+        "merge": "merge",
+        "convert": "convert",
+        "split": "split",
+        "compress": "compress",
+        "rotate": "rotate",
+        "extract": "extract_pages",
+        "images_to_pdf": "images_to_pdf",
+    }
+    # 出力がフォルダになる処理（結果はZIPで返す）
+    DIRECTORY_MODES = {"convert", "split"}
+    OPTION_KEYS = {"password", "image_format", "dpi", "pages", "angle", "pages_to_rotate", "max_bytes",
+                   "skip_duplicate_pages", "threshold", "auto_crop", "downsample", "color_detection",
+                   "linearize", "optimize_fonts", "compression_level", "recompress_flate", "fsync"}
+    CHUNK_SIZE = 1024 * 1024
+    MAX_QUEUE = 100
+    
+    def __init__(self, work_dir, max_workers=2):
+        self.work_dir = work_dir
+        self.upload_dir = os.path.join(work_dir, "uploads")
+        self.job_dir = os.path.join(work_dir, "jobs")
+        os.makedirs(self.upload_dir, exist_ok=True)
+        os.makedirs(self.job_dir, exist_ok=True)
+        
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.lock = threading.Lock()
+        self.uploads = {}  # ID -> パス
+        self.jobs = {}
+        self.started_at = time.monotonic()
+        self.stats = {
+            "queued": 0,
+            "running": 0,
+            "completed": 0,
+            "failed": 0,
+            "bytes_uploaded": 0,
+            "bytes_processed": 0,
+            "bytes_sent": 0,
+            "busy_seconds": 0.0,
+        }
+    
+    def store_upload(self, file_name, stream, length):
+        """アップロードされたデータをメモリに溜めずにファイルへ書き出す"""
+        upload_id = uuid.uuid4().hex
+        file_name = os.path.basename(file_name) or "upload.pdf"
+        target_dir = os.path.join(self.upload_dir, upload_id)
+        os.makedirs(target_dir)
+        path = os.path.join(target_dir, file_name)
+        
+        remaining = length
+        with open(path, 'wb') as output:
+            while remaining > 0:
+                chunk = stream.read(min(self.CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise ValueError("アップロードが途中で終了しました")
+                output.write(chunk)
+                remaining -= len(chunk)
+        
+        with self.lock:
+            self.uploads[upload_id] = path
+            self.stats["bytes_uploaded"] += length
+        return upload_id
+    
+    def delete_upload(self, upload_id):
+        with self.lock:
+            path = self.uploads.pop(upload_id, None)
+        if path is None:
+            return False
+        shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+        return True
+    
+    def submit(self, request):
+        """ジョブを登録してワーカープールで実行（リクエストの形式が不正ならValueError）"""
+        if not isinstance(request, dict):
+            raise ValueError("リクエストはJSONオブジェクトで指定してください")
+        name = request.get("mode")
+        if not isinstance(name, str) or name not in self.MODES:
+            raise ValueError(f"不明な処理です: {name}")
+        inputs = request.get("inputs", [])
+        if not isinstance(inputs, list) or not all(isinstance(upload_id, str) for upload_id in inputs):
+            raise ValueError("inputsはアップロードIDの配列で指定してください")
+        options = request.get("options", {})
+        if not isinstance(options, dict):
+            raise ValueError("optionsはオブジェクトで指定してください")
+        unknown = set(options) - self.OPTION_KEYS
+        if unknown:
+            raise ValueError(f"不明なオプションです: {', '.join(sorted(unknown))}")
+        if options.get("max_bytes") is not None:
+            check_max_bytes(options["max_bytes"])
+        
+        with self.lock:
+            try:
+                files = [self.uploads[upload_id] for upload_id in inputs]
+            except KeyError as e:
+                raise ValueError(f"アップロードが見つかりません: {e.args[0]}")
+            if not files:
+                raise ValueError("入力ファイルが指定されていません")
+            if self.stats["queued"] >= self.MAX_QUEUE:
+                raise OverflowError("待機中のジョブが多すぎます")
+            
+            job_id = uuid.uuid4().hex
+            job_path = os.path.join(self.job_dir, job_id)
+            if name in self.DIRECTORY_MODES:
+                output_path = os.path.join(job_path, "output")
+            else:
+                output_path = os.path.join(job_path, "result.pdf")
+            self.jobs[job_id] = {
+                "id": job_id,
+                "mode": name,
+                "status": "queued",
+                "message": "",
+                "progress": 0,
+                "metrics": None,
+                "output_path": output_path,
+                "submitted_at": time.time(),
+                "duration": None,
+            }
+            self.stats["queued"] += 1
+        
+        os.makedirs(output_path if name in self.DIRECTORY_MODES else job_path, exist_ok=True)
+        self.executor.submit(self.run_job, job_id, files, options)
+        return job_id
+    
+    def run_job(self, job_id, files, options):
+        """ワーカースレッドでジョブを実行"""
+        with self.lock:
+            job = self.jobs[job_id]
+            job["status"] = "running"
+            self.stats["queued"] -= 1
+            self.stats["running"] += 1
+        
+        start_time = time.monotonic()
+        try:
+            # 処理の準備で失敗してもジョブを失敗として終わらせる
+            processor = PDFProcessThread(self.MODES[job["mode"]], files, job["output_path"], **options)
+            # イベントループがないため、進捗はワーカースレッドで直接受け取る
+            processor.progress.connect(lambda value: job.update(progress=value),
+                                       Qt.ConnectionType.DirectConnection)
+            processor.metrics.connect(lambda metrics: job.update(metrics=metrics),
+                                      Qt.ConnectionType.DirectConnection)
+            processor.process()
+            status, message = "completed", processor.completion_message("処理が完了しました！")
+        except Exception as e:
+            status, message = "failed", f"エラーが発生しました: {str(e)}"
+        duration = time.monotonic() - start_time
+        
+        with self.lock:
+            job.update(status=status, message=message, duration=duration)
+            self.stats["running"] -= 1
+            self.stats[status] += 1
+            self.stats["busy_seconds"] += duration
+            self.stats["bytes_processed"] += sum(os.path.getsize(f) for f in files if os.path.exists(f))
+    
+    def job_info(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            return {key: value for key, value in job.items() if key != "output_path"}
+    
+    def result_file(self, job_id):
+        """結果ファイルのパスを取得（フォルダ出力はZIPにまとめる）"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job["status"] != "completed":
+                return None
+            output_path = job["output_path"]
+        
+        if not os.path.isdir(output_path):
+            return output_path
+        
+        zip_path = output_path + ".zip"
+        if not os.path.exists(zip_path):
+            with AtomicOutputFile(zip_path) as output, \
+                    zipfile.ZipFile(output, 'w', zipfile.ZIP_STORED) as archive:
+                for name in sorted(os.listdir(output_path)):
+                    archive.write(os.path.join(output_path, name), name)
+        return zip_path
+    
+    def delete_job(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job["status"] in ("queued", "running"):
+                return False
+            del self.jobs[job_id]
+        shutil.rmtree(os.path.join(self.job_dir, job_id), ignore_errors=True)
+        return True
+    
+    def record_sent(self, size):
+        with self.lock:
+            self.stats["bytes_sent"] += size
+    
+    def metrics(self):
+        """キューの深さとスループットを取得"""
+        with self.lock:
+            stats = dict(self.stats)
+        uptime = time.monotonic() - self.started_at
+        finished = stats["completed"] + stats["failed"]
+        stats.update(
+            queue_depth=stats["queued"],
+            uptime_seconds=round(uptime, 1),
+            jobs_per_minute=round(finished / uptime * 60, 2) if uptime else 0.0,
+            average_job_seconds=round(stats["busy_seconds"] / finished, 3) if finished else None,
+            processed_mb_per_second=(round(stats["bytes_processed"] / stats["busy_seconds"] / 1024 / 1024, 2)
+                                     if stats["busy_seconds"] else None),
+        )
+        return stats
+    
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+class PDFJobRequestHandler(BaseHTTPRequestHandler):
+    """ジョブサービスのHTTPリクエスト処理
+    
+    PUT    /uploads/<ファイル名>   アップロード（本文をそのまま保存）
+    DELETE /uploads/<ID>          アップロードを削除
+    POST   /jobs                  ジョブ登録 {"mode", "inputs", "options"}
+    GET    /jobs/<ID>             ジョブの状態
+    GET    /jobs/<ID>/result      結果のダウンロード
+    DELETE /jobs/<ID>             ジョブを削除
+    GET    /metrics               キューの深さとスループット
+    """
+    protocol_version = "HTTP/1.1"
+    
+    @property
+    def service(self):
+        return self.server.service
+    
+    def send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def content_length(self):
+        length = self.headers.get("Content-Length")
+        return int(length) if length is not None else None
+    
+    def path_parts(self):
+        return [part for part in self.path.split("?")[0].split("/") if part]
+    
+    def do_PUT(self):
+        parts = self.path_parts()
+        if len(parts) != 2 or parts[0] != "uploads":
+            return self.send_json(404, {"error": "not found"})
+        length = self.content_length()
+        if length is None:
+            return self.send_json(411, {"error": "Content-Length が必要です"})
+        
+        try:
+            upload_id = self.service.store_upload(unquote(parts[1]), self.rfile, length)
+        except (OSError, ValueError) as e:
+            self.close_connection = True
+            return self.send_json(400, {"error": str(e)})
+        self.send_json(201, {"upload_id": upload_id})
+    
+    def do_POST(self):
+        if self.path_parts() != ["jobs"]:
+            return self.send_json(404, {"error": "not found"})
+        length = self.content_length() or 0
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+            job_id = self.service.submit(request)
+        except OverflowError as e:
+            return self.send_json(503, {"error": str(e)})
+        except (ValueError, AttributeError) as e:
+            return self.send_json(400, {"error": str(e)})
+        self.send_json(202, {"job_id": job_id})
+    
+    def do_GET(self):
+        parts = self.path_parts()
+        if parts == ["metrics"]:
+            return self.send_json(200, self.service.metrics())
+        if len(parts) == 2 and parts[0] == "jobs":
+            info = self.service.job_info(parts[1])
+            if info is None:
+                return self.send_json(404, {"error": "not found"})
+            return self.send_json(200, info)
+        if len(parts) == 3 and parts[0] == "jobs" and parts[2] == "result":
+            return self.send_result(parts[1])
+        self.send_json(404, {"error": "not found"})
+    
+    def do_DELETE(self):
+        parts = self.path_parts()
+        if len(parts) == 2 and parts[0] == "uploads":
+            deleted = self.service.delete_upload(parts[1])
+        elif len(parts) == 2 and parts[0] == "jobs":
+            deleted = self.service.delete_job(parts[1])
+        else:
+            deleted = False
+        if deleted:
+            return self.send_json(200, {"deleted": parts[1]})
+        self.send_json(404, {"error": "not found"})
+    
+    def send_result(self, job_id):
+        """結果ファイルを少しずつ送信"""
+        path = self.service.result_file(job_id)
+        if path is None:
+            return self.send_json(404, {"error": "結果がありません"})
+        
+        size = os.path.getsize(path)
+        file_name = f"{job_id}{Path(path).suffix}"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/zip" if path.endswith(".zip") else "application/pdf")
+        self.send_header("Content-Length", str(size))
+        self.send_header("Content-Disposition", f'attachment; filename="{file_name}"')
+        self.end_headers()
+        with open(path, 'rb') as result:
+            shutil.copyfileobj(result, self.wfile, self.service.CHUNK_SIZE)
+        self.service.record_sent(size)
+
+
+def run_service(host, port, max_workers):
+    """ジョブサービスを起動（Ctrl+Cで終了）"""
+    work_dir = tempfile.mkdtemp(prefix="pdf-tool-service-")
+    service = PDFJobService(work_dir, max_workers)
+    server = ThreadingHTTPServer((host, port), PDFJobRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    print(f"PDFジョブサービスを起動しました: http://{host}:{server.server_address[1]}/ "
+          f"(ワーカー数: {max_workers}, 作業フォルダ: {work_dir})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="PDF統合・変換ツール")
+    parser.add_argument("--serve", action="store_true",
+                        help="GUIを起動せずにローカルHTTPジョブサービスとして起動する")
+    parser.add_argument("--host", default="127.0.0.1", help="ジョブサービスの待ち受けアドレス")
+    parser.add_argument("--port", type=int, default=8765, help="ジョブサービスのポート番号")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="ジョブサービスの同時処理数")
+    parser.add_argument("--startup-benchmark", action="store_true",
+                        help="GUIの起動時間を計測して終了する")
+    parser.add_argument("--runs", type=int, default=5, help="起動時間の計測回数")
+    parser.add_argument("--max-ms", type=float, default=None,
+                        help="起動時間（中央値）の上限。超えた場合は終了コード1を返す")
+    parser.add_argument("--analyze", metavar="PDF",
+                        help="PDFのサイズの内訳（種類ごと・大きいオブジェクト・重複）を表示して終了する")
+    parser.add_argument("--top", type=int, default=10, help="--analyzeで表示する大きいオブジェクトの数")
+    # 起動時間の計測で子プロセスに渡す（ウィンドウを表示したらすぐに終了する）
+    parser.add_argument("--exit-after-show", action="store_true", help=argparse.SUPPRESS)
+    # Qt固有の引数はQApplicationに渡す
+    return parser.parse_known_args(argv)
+
+
+def run_size_analysis(file_path, largest_count=10):
+    """PDFのサイズの内訳を表示"""
+    try:
+        with open(file_path, 'rb') as pdf_file:
+            analysis = analyze_pdf_size(PyPDF2.PdfReader(pdf_file), largest_count)
+    except Exception as e:
+        print(f"サイズを分析できません: {str(e)}", file=sys.stderr)
+        return 1
+    print(format_size_analysis(analysis))
+    return 0
+
+
+def run_startup_benchmark(runs, max_ms=None):
+    """プロセスの開始からウィンドウが表示されるまでの時間を計測"""
+    if getattr(sys, 'frozen', False):
+        command = [sys.executable, "--exit-after-show"]
+    else:
+        command = [sys.executable, os.path.abspath(__file__), "--exit-after-show"]
+    
+    timings = []
+    for _ in range(max(runs, 1)):
+        started = time.perf_counter()
+        subprocess.run(command, check=True)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    median = timings[len(timings) // 2]
+    print(f"起動時間: 中央値 {median:.0f} ms（最小 {timings[0]:.0f} ms / 最大 {timings[-1]:.0f} ms, {len(timings)}回）")
+    
+    if max_ms is not None and median > max_ms:
+        print(f"起動時間が上限の {max_ms:.0f} ms を超えています", file=sys.stderr)
+        return 1
+    return 0
+
+
 def main():
-    app = QApplication(sys.argv)
+    args, qt_args = parse_args(sys.argv[1:])
+    if args.serve:
+        run_service(args.host, args.port, args.workers)
+        return
+    if args.startup_benchmark:
+        sys.exit(run_startup_benchmark(args.runs, args.max_ms))
+    if args.analyze:
+        sys.exit(run_size_analysis(args.analyze, args.top))
+    
+    app = QApplication(sys.argv[:1] + qt_args)
     app.setStyle('Fusion')
     
     # アプリケーションのスタイルシート
@@ -1351,7 +5297,7 @@ def main():
         QPushButton:hover {
             background-color: #2c3e50;
         }
-        QListWidget {
+        QListView {
             border: 2px solid #bdc3c7;
             border-radius: 5px;
             padding: 5px;
@@ -1367,8 +5313,12 @@ def main():
     
     window = PDFConverterApp()
     window.show()
+    if args.exit_after_show:
+        QTimer.singleShot(0, app.quit)
     sys.exit(app.exec())
 
 
 if __name__ == '__main__':
+    # PyInstallerでまとめた実行ファイルでプロセスプールを使うために必要
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,39 @@
+import PyPDF2
+from PyPDF2 import generic
+
+import main
+
+
+def add_form(pdf_writer, **entries):
+    """同じ内容のフォームXObjectを追加して参照を返す（entriesで辞書の項目を追加）"""
+    form = generic.DecodedStreamObject()
+    form.set_data(b"BT /F1 24 Tf 20 100 Td (Hi) Tj ET")
+    form.update({
+        generic.NameObject('/Type'): generic.NameObject('/XObject'),
+        generic.NameObject('/Subtype'): generic.NameObject('/Form'),
+        generic.NameObject('/BBox'): generic.ArrayObject(generic.NumberObject(v) for v in (0, 0, 200, 200)),
+    })
+    for key, value in entries.items():
+        form[generic.NameObject('/' + key)] = generic.NumberObject(value)
+    return pdf_writer._add_object(form)
+
+
+def test_forms_with_different_struct_parents_stay_distinct():
+    pdf_writer = PyPDF2.PdfWriter()
+    first = add_form(pdf_writer, StructParents=0)
+    second = add_form(pdf_writer, StructParents=1)
+    third = add_form(pdf_writer, StructParent=2)
+    fourth = add_form(pdf_writer, StructParent=3)
+
+    assert main.share_duplicate_objects(pdf_writer) == 0
+    for ref in (first, second, third, fourth):
+        assert not isinstance(ref.get_object(), generic.NullObject)
+
+
+def test_identical_forms_are_shared():
+    pdf_writer = PyPDF2.PdfWriter()
+    add_form(pdf_writer, StructParents=0)
+    duplicate = add_form(pdf_writer, StructParents=0)
+
+    assert main.share_duplicate_objects(pdf_writer) == 1
+    assert isinstance(pdf_writer._objects[duplicate.idnum - 1], generic.NullObject)
@@ -0,0 +1,117 @@
+import os
+import random
+import zlib
+
+import PyPDF2
+import pytest
+
+import main
+
+
+def write_object_stream_pdf(path, sizes, seed=0):
+    """ページなどの辞書をオブジェクトストリームに格納したPDFを書き出す
+
+    sizesはページごとのコンテンツストリームに含める乱数のバイト数（圧縮してもほぼ縮まない）。
+    """
+    rng = random.Random(seed)
+    page_count = len(sizes)
+    page_ids = [4 + 2 * i for i in range(page_count)]
+    content_ids = [5 + 2 * i for i in range(page_count)]
+    objstm_id = 4 + 2 * page_count
+    xref_id = objstm_id + 1
+
+    compressed = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        2: b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+            b" ".join(b"%d 0 R" % page_id for page_id in page_ids), page_count),
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    for page_id, content_id in zip(page_ids, content_ids):
+        compressed[page_id] = (b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                               b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id)
+
+    header = b" ".join(b"%d %d" % item for item in _offsets(compressed))
+    body = b"".join(data + b"\n" for data in compressed.values())
+    objstm = zlib.compress(header + b"\n" + body)
+
+    out = bytearray(b"%PDF-1.5\n")
+    offsets = {}
+    for page_num, (content_id, size) in enumerate(zip(content_ids, sizes), start=1):
+        noise = bytes(rng.getrandbits(8) for _ in range(size)).hex().encode()
+        data = zlib.compress(b"BT /F1 24 Tf 72 720 Td (Page %d) Tj ET\n%%%s\n" % (page_num, noise))
+        offsets[content_id] = len(out)
+        out += b"%d 0 obj\n<< /Length %d /Filter /FlateDecode >>\nstream\n" % (content_id, len(data))
+        out += data + b"\nendstream\nendobj\n"
+    offsets[objstm_id] = len(out)
+    out += (b"%d 0 obj\n<< /Type /ObjStm /N %d /First %d /Length %d /Filter /FlateDecode >>\nstream\n"
+            % (objstm_id, len(compressed), len(header) + 1, len(objstm)))
+    out += objstm + b"\nendstream\nendobj\n"
+
+    indexes = {idnum: index for index, idnum in enumerate(compressed)}
+    offsets[xref_id] = len(out)
+    rows = bytearray()
+    for idnum in range(xref_id + 1):
+        if idnum in indexes:
+            rows += bytes([2]) + objstm_id.to_bytes(4, 'big') + indexes[idnum].to_bytes(2, 'big')
+        elif idnum in offsets:
+            rows += bytes([1]) + offsets[idnum].to_bytes(4, 'big') + bytes(2)
+        else:
+            rows += bytes([0]) + bytes(4) + b"\xff\xff"
+    out += (b"%d 0 obj\n<< /Type /XRef /Size %d /W [1 4 2] /Root 1 0 R /Length %d >>\nstream\n"
+            % (xref_id, xref_id + 1, len(rows)))
+    out += rows + b"\nendstream\nendobj\n"
+    out += b"startxref\n%d\n%%%%EOF\n" % offsets[xref_id]
+    path.write_bytes(bytes(out))
+
+
+def _offsets(objects):
+    offset = 0
+    for idnum, data in objects.items():
+        yield idnum, offset
+        offset += len(data) + 1
+
+
+def split_by_size(source, output_dir, max_bytes):
+    output_dir.mkdir()
+    main.PDFProcessThread('split', [str(source)], str(output_dir), max_bytes=max_bytes).process()
+    parts = sorted(output_dir.iterdir(), key=lambda path: int(path.stem.rsplit('_', 1)[1]))
+    return parts, [len(PyPDF2.PdfReader(str(part)).pages) for part in parts]
+
+
+def test_object_stream_source_parts_fit(tmp_path):
+    source = tmp_path / 'objstm.pdf'
+    sizes = [random.Random(page).randint(2000, 12000) for page in range(24)]
+    write_object_stream_pdf(source, sizes)
+    assert PyPDF2.PdfReader(str(source)).xref_objStm
+
+    max_bytes = 40000
+    parts, page_counts = split_by_size(source, tmp_path / 'parts', max_bytes)
+
+    assert len(parts) > 1
+    assert sum(page_counts) == len(sizes)
+    for part in parts:
+        assert os.path.getsize(part) <= max_bytes
+
+
+def test_underestimated_part_is_split_again(tmp_path, monkeypatch):
+    source = tmp_path / 'objstm.pdf'
+    write_object_stream_pdf(source, [8000] * 10)
+    # 見積もりが0なら全ページが1つのファイルに計画されるので、書き出した大きさで分け直す必要がある
+    monkeypatch.setattr(main.ObjectSizeEstimator, 'object_size', lambda self, idnum: 0)
+
+    max_bytes = 40000
+    parts, page_counts = split_by_size(source, tmp_path / 'parts', max_bytes)
+
+    assert len(parts) > 1
+    assert sum(page_counts) == 10
+    for part in parts:
+        assert os.path.getsize(part) <= max_bytes
+
+
+@pytest.mark.parametrize('max_bytes', ['abc', 0, -1, 1.5, True])
+def test_invalid_max_bytes(tmp_path, max_bytes):
+    source = tmp_path / 'objstm.pdf'
+    write_object_stream_pdf(source, [100])
+    processor = main.PDFProcessThread('split', [str(source)], str(tmp_path), max_bytes=max_bytes)
+    with pytest.raises(ValueError, match='正の整数'):
+        processor.process()